@@ -0,0 +1,113 @@
+# Strategos chess engine, written in Python.
+
+# analysiscache.py contains the persistent analysis cache.
+# The depth, score and best move of every completed iteration at the root are written
+# to an SQLite file keyed by Zobrist hash, so that analysis survives `ucinewgame` and
+# engine restarts. Several engine processes on one host can share the same file:
+# SQLite's write-ahead log lets them read while another one writes.
+
+import sqlite3
+import time
+
+import tt
+from engine_types import *
+
+# Number of writes between two checks of the size limit.
+EVICTION_INTERVAL = 100
+
+class AnalysisCache:
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self.writes = 0
+        # autocommit mode, so that every statement is its own short transaction
+        self.connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS analysis ("
+                                "key INTEGER PRIMARY KEY, depth INTEGER, score INTEGER, move TEXT, used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS analysis_used ON analysis (used)")
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def to_sql(key: int):
+        """SQLite integers are signed 64-bit, Zobrist keys are unsigned."""
+        return key - (1 << 64) if key >= 1 << 63 else key
+
+    def get(self, key: int):
+        """Return (depth, score, move) for the position, or None."""
+        row = self.connection.execute("SELECT depth, score, move FROM analysis WHERE key = ?",
+                                      (self.to_sql(key),)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute("UPDATE analysis SET used = ? WHERE key = ?", (time.time(), self.to_sql(key)))
+        return row[0], row[1], chess.Move.from_uci(row[2])
+
+    def put(self, key: int, depth: int, score: int, move: chess.Move):
+        """Record a result, unless a deeper one is already stored."""
+        self.connection.execute(
+            "INSERT INTO analysis (key, depth, score, move, used) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET depth = excluded.depth, score = excluded.score, "
+            "move = excluded.move, used = excluded.used WHERE excluded.depth >= analysis.depth",
+            (self.to_sql(key), depth, int(score), move.uci(), time.time()))
+
+        self.writes += 1
+        if self.writes % EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """If there are too many entries, delete the least recently used ones, down to 90% of the limit."""
+        count = self.connection.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute("DELETE FROM analysis WHERE key IN "
+                                    "(SELECT key FROM analysis ORDER BY used LIMIT ?)",
+                                    (count - self.max_entries * 9 // 10,))
+
+    def seed(self, table: tt.TranspositionTable):
+        """Store the most recently used entries in the transposition table, as exact scores."""
+        rows = self.connection.execute("SELECT key, depth, score, move FROM analysis ORDER BY used DESC LIMIT ?",
+                                       (table.size,))
+        n = 0
+        for key, depth, score, move in rows:
+            table.store(key % (1 << 64), depth, tt.BOUND_EXACT, score, chess.Move.from_uci(move))
+            n += 1
+        return n
+
+cache = None
+
+def open_cache(path: str):
+    """Open the cache file, or close the cache if the path is empty."""
+    global cache
+    if cache is not None:
+        cache.close()
+    cache = None
+    if path and path != "<empty>":
+        cache = AnalysisCache(path, config.ANALYSIS_CACHE_SIZE)
+        seed()
+
+def seed():
+    """Fill the transposition table from the cache, if enabled (UCI option AnalysisCacheSeed).
+    Called whenever the table is created or cleared."""
+    if cache is not None and config.ANALYSIS_CACHE_SEED:
+        n = cache.seed(tt.table)
+        print(f"info string seeded {n} positions from the analysis cache")
+
+def probe(pos):
+    """Return the stored (depth, score, move) of the position, or None."""
+    if cache is None:
+        return None
+    try:
+        return cache.get(pos.key())
+    except sqlite3.Error:
+        return None
+
+def store(pos, depth: int, score: int, move: chess.Move):
+    """Record the result of a completed iteration at the root."""
+    if cache is None or move is None:
+        return
+    try:
+        cache.put(pos.key(), depth, score, move)
+    except sqlite3.Error:
+        # e.g. the file is locked by another engine for longer than the timeout: the cache is only an aid
+        pass
@@ -0,0 +1,218 @@
+# Strategos chess engine, written in Python.
+
+# analyze.py contains the batch analysis of large sets of positions, without the UCI protocol.
+# Positions are streamed from a file (or stdin) of FENs, EPD lines or PGN games, and searched by a pool
+# of worker processes under a depth, node or time budget. One JSON line per position is written as soon
+# as its analysis finishes, so the results are in the order they finish, and each carries the index
+# of its position in the input. Only a few positions per worker are read ahead, so the memory use
+# does not grow with the input. Running the same command again resumes an interrupted run:
+# the positions already in the output file are skipped.
+#   python main.py analyze games.pgn --output analysis.jsonl --depth 8 --workers 8
+#   python analyze.py positions.fen --nodes 20000 --min-ply 10 > analysis.jsonl
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import chess.pgn
+
+import epd
+import search
+import smp
+import timeman
+import tt
+from engine_types import *
+
+# positions sent to the pool ahead of the results, per worker
+READ_AHEAD = 4
+
+def read_positions(args, writer=None):
+    """Yield the positions to analyze as (index, id, fen), in input order.
+    Lines that are not a valid FEN or EPD are reported and counted as skipped by the writer."""
+    stream = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        index = 0
+        if args.format == "pgn":
+            gameNumber = 0
+            while True:
+                game = chess.pgn.read_game(stream)
+                if game is None:
+                    break
+                gameNumber += 1
+                board = game.board()
+                ply = 0
+                for move in [None] + list(game.mainline_moves()):
+                    if move is not None:
+                        board.push(move)
+                        ply += 1
+                    if ply >= args.min_ply:
+                        yield index, f"game {gameNumber} ply {ply}", board.fen()
+                        index += 1
+        else:
+            for number, line in enumerate(stream, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    board = chess.Board(line)
+                except ValueError:
+                    try:
+                        board, _ = chess.Board.from_epd(line)
+                    except ValueError:
+                        board = None
+                if board is None or not board.is_valid():
+                    print(f"line {number}: not a valid FEN or EPD, skipped", file=sys.stderr)
+                    if writer is not None:
+                        writer.skipped += 1
+                    continue
+                yield index, f"line {number}", board.fen()
+                index += 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def read_done(path: str):
+    """Return the indexes of the positions already in the output file, as (first missing index,
+    set of the indexes above it). A line cut off by an interruption is removed."""
+    first = 0
+    done = set()
+    if path == "-" or not os.path.exists(path):
+        return first, done
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                # the last line was not completely written
+                f.truncate(offset)
+                break
+            offset += len(line)
+            try:
+                done.add(json.loads(line)["index"])
+            except (ValueError, KeyError):
+                continue
+            # results arrive almost in order: only the ones past a gap are kept
+            while first in done:
+                done.remove(first)
+                first += 1
+    return first, done
+
+def init_worker(hash_size: int):
+    config.HASH_SIZE = hash_size
+    epd.init_worker()
+    tt.table.resize(hash_size)
+
+def analyze_position(item: tuple, depth: int, nodes: int, movetime: int):
+    """Search one position, and return its result as a dict."""
+    index, name, fen = item
+    result = {"index": index, "id": name, "fen": fen}
+    board = chess.Board(fen)
+    if board.is_game_over():
+        # nothing to search: checkmate, stalemate, or a draw by insufficient material
+        result.update(depth=0, score={"mate": 0} if board.is_checkmate() else {"cp": 0}, bestmove=None, pv=[],
+                      nodes=0, time=0)
+        return result
+
+    limits = timeman.Limits()
+    limits.depth, limits.nodes, limits.movetime = depth, nodes, movetime
+    bestMove, iterations, totalTime = epd.search_position(fen, limits)
+    score = None
+    pv = [bestMove] if bestMove else []
+    lastDepth = 0
+    if iterations:
+        tokens = iterations[-1]
+        lastDepth = int(tokens[tokens.index("depth") + 1])
+        i = tokens.index("score")
+        score = {tokens[i + 1]: int(tokens[i + 2])}
+        pv = tokens[tokens.index("pv") + 1:]
+        if pv[0] != bestMove:
+            pv = [bestMove]  # changed by the last, unfinished iteration
+    result.update(depth=lastDepth, score=score, bestmove=bestMove, pv=pv, nodes=search.nodes, time=totalTime)
+    return result
+
+class Writer:
+    """Writes the results as they come back from the workers, and reports the progress."""
+    def __init__(self, path: str, total_done: int):
+        self.out = sys.stdout if path == "-" else open(path, "a")
+        self.written = 0
+        self.skipped = total_done
+        self.start = time.time()
+        self.slots = None
+
+    def write(self, result: dict):
+        self.out.write(json.dumps(result) + "\n")
+        self.out.flush()
+        self.written += 1
+        if self.written % 100 == 0:
+            self.progress()
+        if self.slots is not None:
+            self.slots.release()
+
+    def failed(self, error: BaseException):
+        print(f"analysis failed: {error!r}", file=sys.stderr)
+        if self.slots is not None:
+            self.slots.release()
+
+    def progress(self):
+        t = time.time() - self.start
+        print(f"{self.written} positions analyzed ({self.skipped} skipped) in {round(t, 1)}s, "
+              f"{round(self.written / t, 1) if t else 0} positions/s", file=sys.stderr)
+
+    def close(self):
+        if self.out is not sys.stdout:
+            self.out.close()
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="analyze", description="Analyze a stream of positions.")
+    parser.add_argument("input", help="file of FEN/EPD lines or PGN games, or - for stdin")
+    parser.add_argument("--format", choices=["fen", "pgn"], help="input format (default: from the file extension)")
+    parser.add_argument("--output", "-o", default="-", help="JSON Lines file the results are appended to")
+    limits = parser.add_mutually_exclusive_group()
+    limits.add_argument("--depth", type=int, help="search depth (default 6)")
+    limits.add_argument("--nodes", type=int, help="nodes per position")
+    limits.add_argument("--movetime", type=int, help="time per position, in ms")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--hash", type=int, default=config.HASH_SIZE, help="hash size of every worker, in MB")
+    parser.add_argument("--min-ply", type=int, default=0, help="skip the first plies of every PGN game")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        args.format = "pgn" if args.input.lower().endswith(".pgn") else "fen"
+    if args.depth is None and args.nodes is None and args.movetime is None:
+        args.depth = 6
+    budget = (args.depth, args.nodes, args.movetime)
+
+    first, done = read_done(args.output)
+    writer = Writer(args.output, first + len(done))
+    ctx = smp.context()
+    try:
+        if ctx is None or args.workers <= 1:
+            init_worker(args.hash)
+            for item in read_positions(args, writer):
+                if item[0] >= first and item[0] not in done:
+                    writer.write(analyze_position(item, *budget))
+        else:
+            # the input is read only as fast as the workers take positions
+            writer.slots = threading.Semaphore(args.workers * READ_AHEAD)
+            pool = ctx.Pool(args.workers, initializer=init_worker, initargs=(args.hash,))
+            try:
+                for item in read_positions(args, writer):
+                    if item[0] < first or item[0] in done:
+                        continue
+                    writer.slots.acquire()
+                    pool.apply_async(analyze_position, (item, *budget), callback=writer.write,
+                                     error_callback=writer.failed)
+                pool.close()
+                pool.join()
+            except BaseException:
+                pool.terminate()
+                raise
+    except KeyboardInterrupt:
+        print("interrupted: run the same command again to resume", file=sys.stderr)
+    finally:
+        writer.progress()
+        writer.close()
+
+if __name__ == "__main__":
+    main()
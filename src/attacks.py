@@ -0,0 +1,53 @@
+# Strategos chess engine, written in Python.
+
+# attacks.py contains the attack information shared by the evaluation terms.
+# The attacks of every piece are computed once per evaluation, and inverted into the attackers
+# of every occupied square, so that the terms (hanging pieces, pins, multiple attacks) read
+# bitboards instead of looking up the sliders' attacks again for every square.
+
+import bitboard
+from engine_types import *
+
+class AttackInfo:
+    """Attack information of a position, indexed by color:
+    attacked[color]           the squares attacked by the pieces of `color`
+    attackers[color][square]  the pieces of `color` attacking the (occupied) square
+    pinned[color]             the pieces of `color` pinned to their king
+    checkers                  the pieces giving check to the side to move"""
+
+    def __init__(self, board: bitboard.Board):
+        self.board = board
+        occupied = board.occupied
+        self.attacked = [0, 0]
+        self.attackers = [[0] * 64, [0] * 64]
+        for color in [chess.BLACK, chess.WHITE]:
+            attacked = 0
+            attackers = self.attackers[color]
+            pieces = board.occupied_co[color]
+            while pieces:
+                square = pieces.bit_length() - 1
+                bit = chess.BB_SQUARES[square]
+                pieces ^= bit
+                attacks = board.attacks_mask(square)
+                attacked |= attacks
+                targets = attacks & occupied
+                while targets:
+                    target = targets.bit_length() - 1
+                    targets ^= chess.BB_SQUARES[target]
+                    attackers[target] |= bit
+            self.attacked[color] = attacked
+
+        self.pinned = [0, 0]
+        for color in [chess.BLACK, chess.WHITE]:
+            king = board.king(color)
+            if king is not None:
+                self.pinned[color] = board.slider_blockers(king, color)
+        king = board.king(board.turn)
+        self.checkers = 0 if king is None else self.attackers[not board.turn][king]
+
+    def count(self, color: chess.Color, square: chess.Square):
+        """The number of pieces of `color` attacking the (occupied) square."""
+        return chess.popcount(self.attackers[color][square])
+
+    def is_pinned(self, color: chess.Color, square: chess.Square):
+        return bool(self.pinned[color] & chess.BB_SQUARES[square])
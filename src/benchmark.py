@@ -1,12 +1,28 @@
 # Strategos chess engine, written in Python.
 
 # benchmark.py contains the benchmarking code for the engine.
-# It is called when the "bench" command is given.
+# It is called when the "bench" command is given:
+#   bench [depth] [threads] [hash] [json <file>] [baseline <file>]
+#   bench eval [iterations]      evaluation speed only
+#   bench movegen [iterations]   move generation speed only
+#   bench batch [iterations]     batched evaluation terms against the batch size
 
+import json
+import os
 import time
 
+import analysiscache
+import bitboard
+import endgame
+import evalcache
+import evaluate
+import evalbatch
+import movepick
 import position
 import search
+import smp
+import stop_search
+import tt
 from engine_types import *
 
 fens = [
@@ -22,33 +38,200 @@ fens = [
     "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
 ]
 
+def reset_state():
+    """Forget everything learned from earlier searches, so that every position is benchmarked
+    the same way no matter what ran before it."""
+    tt.table.clear()
+    evalcache.cache.clear()
+    endgame.cache.clear()
+    movepick.clear()
+    search.nodes = 0
+    stop_search.reset()
+
 def benchmark_fen(fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", depth=5):
     """Run a benchmark to get # of nodes searched up to a certain depth."""
     pos = position.Position(fen)
-    startNodes = search.nodes
+    reset_state()
     start = time.time()
-    search.iterative_deepening(pos, depth, pos.side_to_move)
+    bestMove = search.iterative_deepening(pos, depth, pos.side_to_move)
     end = time.time()
-    n = search.nodes - startNodes
-    
-    return n, round(end - start, 2)  # nodes, time
     
-def benchmark():
-    """Run a benchmark for a set of FENs."""
-    egtb_enable = config.USE_ONLINE_TABLEBASE
-    if egtb_enable:
-        config.USE_ONLINE_TABLEBASE = False
+    return search.nodes, round(end - start, 3), bestMove  # nodes, time, best move
+
+def benchmark(depth=5, threads=None, hash_size=None, json_file=None, baseline_file=None):
+    """Run a benchmark for a set of FENs.
+    The total node count is a signature of the search: any functional change to the search
+    or the evaluation changes it (with one thread; parallel searches are not deterministic).
+    The results can be written to a JSON report, and compared to an earlier report."""
+    original = (config.USE_ONLINE_TABLEBASE, config.THREADS, config.HASH_SIZE, analysiscache.cache, config.OWN_BOOK,
+                endgame.tablebase)
+    # results must not depend on the network, on what earlier sessions stored, on the book or on SyzygyPath
+    config.USE_ONLINE_TABLEBASE = False
+    config.OWN_BOOK = False
+    analysiscache.cache = None
+    endgame.tablebase = None
+    evalcache.cache.clear()  # evaluations may have been cached with tablebase scores
+    smp.set_threads(threads or config.THREADS)
+    config.HASH_SIZE = hash_size or config.HASH_SIZE
+    tt.table.resize(config.HASH_SIZE)
     
-    nodes = totalTime = 0
+    results = []
     for fen in fens:
         print(f"\nposition fen {fen}")
-        n, t = benchmark_fen(fen)
-        nodes += n
-        totalTime += t
+        n, t, bestMove = benchmark_fen(fen, depth)
+        results.append({"fen": fen, "nodes": n, "time": t, "nps": round(n / t) if t else 0, "bestmove": bestMove})
+    
+    print()
+    for i, result in enumerate(results):
+        print(f"Position {i + 1:2}: nodes {result['nodes']:8} time {result['time']:7.3f}s "
+              f"nps {result['nps']:6} bestmove {result['bestmove']}")
     
+    nodes = sum(result["nodes"] for result in results)
+    totalTime = sum(result["time"] for result in results)
     print(f"Nodes searched: {nodes}")
     print(f"Time taken: {round(totalTime, 2)}s")
-    print(f"Nodes per second: {round(nodes / totalTime, 2)}")
+    print(f"Nodes per second: {round(nodes / totalTime) if totalTime else 0}")
+    print(f"Signature: {nodes}")
+    
+    report = {"depth": depth, "threads": config.THREADS, "hash": config.HASH_SIZE, "positions": results,
+              "nodes": nodes, "time": round(totalTime, 3), "nps": round(nodes / totalTime) if totalTime else 0}
+    if json_file is not None:
+        with open(json_file, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {json_file}")
+    if baseline_file is not None:
+        compare(report, baseline_file)
+    
+    # restore the settings
+    config.USE_ONLINE_TABLEBASE, threads, config.HASH_SIZE, analysiscache.cache, config.OWN_BOOK, \
+        endgame.tablebase = original
+    evalcache.cache.clear()
+    smp.set_threads(threads)
+    tt.table.resize(config.HASH_SIZE)
+    analysiscache.seed()
+
+def compare(report: dict, baseline_file: str):
+    """Compare a benchmark report to a baseline report written by an earlier run."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    
+    print(f"\nComparison with {baseline_file}:")
+    if (baseline["depth"], baseline["threads"]) != (report["depth"], report["threads"]):
+        print(f"Warning: baseline ran with depth {baseline['depth']} and {baseline['threads']} threads")
+    
+    for i, (old, new) in enumerate(zip(baseline["positions"], report["positions"])):
+        if old["fen"] != new["fen"]:
+            print(f"Position {i + 1:2}: different position, not compared")
+        elif old["nodes"] != new["nodes"] or old["bestmove"] != new["bestmove"]:
+            print(f"Position {i + 1:2}: nodes {old['nodes']} -> {new['nodes']}, "
+                  f"bestmove {old['bestmove']} -> {new['bestmove']}")
+    
+    if baseline["nodes"] == report["nodes"]:
+        print(f"Signature unchanged: {report['nodes']}")
+    else:
+        print(f"Signature changed: {baseline['nodes']} -> {report['nodes']}")
+    speedup = report["nps"] / baseline["nps"] if baseline["nps"] else 0
+    print(f"Nodes per second: {baseline['nps']} -> {report['nps']} ({round((speedup - 1) * 100, 1):+}%)")
+
+def bench_positions():
+    """The benchmark positions and all positions one move away from them."""
+    positions = []
+    for fen in fens:
+        board = chess.Board(fen)
+        positions.append(fen)
+        for move in board.legal_moves:
+            board.push(move)
+            positions.append(board.fen())
+            board.pop()
+    return positions
+
+def eval_benchmark(iterations=10):
+    """Measure the speed of the evaluation alone, without the evaluation cache."""
+    positions = [position.Position(fen) for fen in bench_positions()]
+    start = time.time()
+    for _ in range(iterations):
+        for pos in positions:
+            evaluate.evaluate_uncached(pos, pos.side_to_move)
+    t = time.time() - start
+    
+    n = iterations * len(positions)
+    print(f"Evaluations: {n}")
+    print(f"Time taken: {round(t, 2)}s")
+    print(f"Evaluations per second: {round(n / t) if t else 0}")
+
+def batch_benchmark(iterations=10):
+    """Measure the throughput of the batched material, PSQT and pawn terms against the batch size,
+    with the same terms of the scalar evaluation for reference, and check that they agree."""
+    if not evalbatch.available():
+        print("info string NumPy is not installed")
+        return
+    positions = [position.Position(fen) for fen in bench_positions()]
+    masks = [evalbatch.piece_masks(pos.board) for pos in positions]
+    sides = [pos.side_to_move for pos in positions]
+
+    def scalar_terms(pos):
+        stm = pos.side_to_move
+        phase = pos.game_phase()
+        v = pos.material(stm) - pos.material(not stm) + pos.psqt(stm, phase) - pos.psqt(not stm, phase)
+        return v + evaluate.pawn_eval(pos.board, stm, phase) if phase == ENDGAME else v
+
+    start = time.time()
+    for _ in range(iterations):
+        expected = [scalar_terms(pos) for pos in positions]
+    t = time.time() - start
+    n = iterations * len(positions)
+    print(f"scalar      positions/s {round(n / t) if t else 0}")
+
+    for size in [1, 4, 16, 64, 256, 1024]:
+        start = time.time()
+        for _ in range(iterations):
+            scores = []
+            for i in range(0, len(masks), size):
+                scores += evalbatch.evaluate_batch(masks[i:i + size], sides[i:i + size])
+        t = time.time() - start
+        mismatches = sum(score != e for score, e in zip(scores, expected))
+        print(f"batch {size:<5} positions/s {round(n / t) if t else 0} mismatches {mismatches}")
+
+def movegen_benchmark(iterations=10):
+    """Measure the speed of legal move generation alone."""
+    boards = [bitboard.Board(fen) for fen in bench_positions()]
+    moves = 0
+    start = time.time()
+    for _ in range(iterations):
+        for board in boards:
+            moves += len(board.generate_legal_moves())
+    t = time.time() - start
+    
+    print(f"Positions: {iterations * len(boards)}")
+    print(f"Moves generated: {moves}")
+    print(f"Time taken: {round(t, 2)}s")
+    print(f"Moves per second: {round(moves / t) if t else 0}")
+
+def smp_benchmark(depth=4, max_threads=None):
+    """Measure the time to reach a depth with 1, 2, 4, ... up to max_threads search processes."""
+    max_threads = max_threads or os.cpu_count()
+    original_threads = config.THREADS
+    original_cache = analysiscache.cache
+    analysiscache.cache = None
+    
+    results = []
+    threads = 1
+    while True:
+        smp.set_threads(threads)
+        totalTime = 0
+        for fen in fens:
+            print(f"\nposition fen {fen}")
+            _, t, _ = benchmark_fen(fen, depth)
+            totalTime += t
+        results.append((threads, totalTime))
+        
+        if threads >= max_threads:
+            break
+        threads = min(threads * 2, max_threads)
+    
+    print(f"\nTime to depth {depth}:")
+    for threads, t in results:
+        print(f"Threads {threads}: {round(t, 2)}s, speedup {round(results[0][1] / t, 2) if t else 0}x")
     
-    # reset the egtb setting
-    config.USE_ONLINE_TABLEBASE = egtb_enable
\ No newline at end of file
+    smp.set_threads(original_threads)
+    analysiscache.cache = original_cache
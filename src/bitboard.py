@@ -1,32 +1,652 @@
 # Strategos chess engine, written in Python.
 
 # bitboard.py contains the Board class, which is the representation of the chess board.
+# The board is kept in integer bitboards (one per piece type and per color) and a mailbox,
+# with precomputed attack tables for every piece. Moves are made and unmade in place:
+# push() saves only what it can't undo (captured piece, castling rights, en passant square,
+# counters and hash) on an undo stack. The Zobrist hash follows the Polyglot scheme and is
+# updated incrementally.
+# Board offers the subset of the chess.Board API that the engine uses, with the same
+# semantics and the same legal move order, so that searches are unchanged. python-chess is
+# only used at the boundary: to parse FENs, and through chess_board() for tablebase probing.
 
 import chess
+import chess.polyglot
 from engine_types import *
 
+BB_ALL = chess.BB_ALL
+BB_SQUARES = chess.BB_SQUARES
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = chess.PIECE_TYPES
+
+def sliding_attacks(square: int, occupied: int, deltas):
+    attacks = 0
+    for delta in deltas:
+        sq = square
+        while True:
+            sq += delta
+            if not 0 <= sq < 64 or chess.square_distance(sq, sq - delta) > 2:
+                break
+            attacks |= BB_SQUARES[sq]
+            if occupied & BB_SQUARES[sq]:
+                break
+    return attacks
+
+def step_attacks(square: int, deltas):
+    return sliding_attacks(square, BB_ALL, deltas)
+
+def attack_table(deltas):
+    """For each square: the relevant occupancy mask, and the attacks for every occupancy of that mask."""
+    masks = []; tables = []
+    for square in chess.SQUARES:
+        edges = ((chess.BB_RANK_1 | chess.BB_RANK_8) & ~chess.BB_RANKS[chess.square_rank(square)]) | \
+                ((chess.BB_FILE_A | chess.BB_FILE_H) & ~chess.BB_FILES[chess.square_file(square)])
+        mask = sliding_attacks(square, 0, deltas) & ~edges
+        table = {}
+        subset = 0
+        while True:  # all subsets of the mask (Carry-Rippler)
+            table[subset] = sliding_attacks(square, subset, deltas)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask); tables.append(table)
+    return masks, tables
+
+KNIGHT_ATTACKS = [step_attacks(sq, [17, 15, 10, 6, -17, -15, -10, -6]) for sq in chess.SQUARES]
+KING_ATTACKS = [step_attacks(sq, [9, 8, 7, 1, -9, -8, -7, -1]) for sq in chess.SQUARES]
+PAWN_ATTACKS = [[step_attacks(sq, [-7, -9]) for sq in chess.SQUARES],  # black
+                [step_attacks(sq, [7, 9]) for sq in chess.SQUARES]]  # white
+DIAG_MASKS, DIAG_ATTACKS = attack_table([-9, -7, 7, 9])
+FILE_MASKS, FILE_ATTACKS = attack_table([-8, 8])
+RANK_MASKS, RANK_ATTACKS = attack_table([-1, 1])
+
+def rays():
+    """RAYS[a][b]: the whole line through a and b (0 if not aligned). BETWEEN[a][b]: the squares strictly between."""
+    lines = []; between = []
+    for a in chess.SQUARES:
+        lineRow = []; betweenRow = []
+        for b in chess.SQUARES:
+            line = 0
+            for attacks in [DIAG_ATTACKS, FILE_ATTACKS, RANK_ATTACKS]:
+                if attacks[a][0] & BB_SQUARES[b]:
+                    line = (attacks[a][0] & attacks[b][0]) | BB_SQUARES[a] | BB_SQUARES[b]
+            lineRow.append(line)
+            segment = line & ((BB_ALL << a) ^ (BB_ALL << b))  # from the lower square to below the higher one
+            betweenRow.append(segment & (segment - 1))
+        lines.append(lineRow); between.append(betweenRow)
+    return lines, between
+
+RAYS, BETWEEN = rays()
+
+# attacks of a rook and a bishop on an empty board
+ROOK_LINES = [RANK_ATTACKS[sq][0] | FILE_ATTACKS[sq][0] for sq in chess.SQUARES]
+BISHOP_LINES = [DIAG_ATTACKS[sq][0] for sq in chess.SQUARES]
+
+# Every move object is created once, and shared by all positions.
+MOVES = [[chess.Move(a, b) for b in chess.SQUARES] for a in chess.SQUARES]
+PROMOTIONS = [[[chess.Move(a, b, pt) for pt in [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]]
+               for b in chess.SQUARES] for a in chess.SQUARES]
+
+# Polyglot Zobrist keys
+ZOBRIST = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+PIECE_KEYS = [[[ZOBRIST[64 * ((pt - 1) * 2 + color) + sq] if pt else 0 for sq in chess.SQUARES]
+               for pt in range(7)] for color in [chess.BLACK, chess.WHITE]]
+CASTLING_KEYS = [(chess.BB_H1, ZOBRIST[768]), (chess.BB_A1, ZOBRIST[769]),
+                 (chess.BB_H8, ZOBRIST[770]), (chess.BB_A8, ZOBRIST[771])]
+TURN_KEY = ZOBRIST[780]
+
+def castling_key(castling_rights: int):
+    key = 0
+    for rook, k in CASTLING_KEYS:
+        if castling_rights & rook:
+            key ^= k
+    return key
+
 class Board:
-    board = None
-    
+    __slots__ = ("bitboards", "occupied_co", "occupied", "mailbox", "turn", "castling_rights", "ep_square",
+                 "halfmove_clock", "fullmove_number", "key", "stack", "legal_cache")
+
     def __init__(self, fen=None):
-        if fen is None:
-            self.board = chess.Board()
-        else:
-            self.board = chess.Board(fen)
-    
+        board = chess.Board() if fen is None else chess.Board(fen)
+        self.bitboards = [0, board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.mailbox = [board.piece_type_at(sq) or 0 for sq in chess.SQUARES]
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.stack = []
+        self.legal_cache = (None, None, None)
+
+        # hash of the pieces, castling rights and turn; the en passant file is added by zobrist()
+        self.key = castling_key(self.castling_rights) ^ (TURN_KEY if self.turn else 0)
+        for sq in chess.SQUARES:
+            if self.mailbox[sq]:
+                self.key ^= PIECE_KEYS[bool(self.occupied_co[chess.WHITE] & BB_SQUARES[sq])][self.mailbox[sq]][sq]
+
+    # Piece bitboards, named as in chess.Board
+    pawns = property(lambda self: self.bitboards[chess.PAWN])
+    knights = property(lambda self: self.bitboards[chess.KNIGHT])
+    bishops = property(lambda self: self.bitboards[chess.BISHOP])
+    rooks = property(lambda self: self.bitboards[chess.ROOK])
+    queens = property(lambda self: self.bitboards[chess.QUEEN])
+    kings = property(lambda self: self.bitboards[chess.KING])
+
     def fen(self):
-        return self.board.fen()
-    
+        return self.chess_board().fen()
+
     def chess_board(self):
-        """return the chess.Board object, which contains many useful methods"""
-        return self.board
-    
+        """Return a chess.Board of the position, for what the engine leaves to python-chess (e.g. tablebases).
+        It doesn't know the moves played before, and it is not kept up to date: don't use it in the search."""
+        rows = []
+        for rank in range(7, -1, -1):
+            row = ""; empty = 0
+            for file in range(8):
+                sq = chess.square(file, rank)
+                if self.mailbox[sq]:
+                    if empty:
+                        row += str(empty); empty = 0
+                    symbol = chess.piece_symbol(self.mailbox[sq])
+                    row += symbol.upper() if self.occupied_co[chess.WHITE] & BB_SQUARES[sq] else symbol
+                else:
+                    empty += 1
+            rows.append(row + (str(empty) if empty else ""))
+        castling = "".join(symbol for rook, symbol in [(chess.BB_H1, "K"), (chess.BB_A1, "Q"),
+                           (chess.BB_H8, "k"), (chess.BB_A8, "q")] if self.castling_rights & rook) or "-"
+        ep = chess.SQUARE_NAMES[self.ep_square] if self.ep_square is not None else "-"
+        return chess.Board(f"{'/'.join(rows)} {'w' if self.turn else 'b'} {castling} {ep} "
+                           f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def zobrist(self):
+        """return the Zobrist hash of the position (Polyglot scheme, same as chess.polyglot.zobrist_hash)"""
+        if self.ep_square is not None:
+            # the en passant file only counts if a pawn is ready to capture
+            if PAWN_ATTACKS[not self.turn][self.ep_square] & self.bitboards[chess.PAWN] & self.occupied_co[self.turn]:
+                return self.key ^ ZOBRIST[772 + (self.ep_square & 7)]
+        return self.key
+
     def material(self, side_to_move: chess.Color, phase=MIDDLEGAME):
         """Count the pieces on a board, and then return the material value."""
         material = 0
-        
+
         for pieceType in PIECE_TYPES:
-            for piece in self.chess_board().pieces(piece_type=pieceType, color=side_to_move):
+            for piece in self.pieces(pieceType, side_to_move):
                 material += material_(pieceType, phase)
-        
-        return material
\ No newline at end of file
+
+        return material
+
+    # Piece access
+
+    def piece_type_at(self, square: chess.Square):
+        return self.mailbox[square] or None
+
+    def color_at(self, square: chess.Square):
+        if self.occupied_co[chess.WHITE] & BB_SQUARES[square]:
+            return chess.WHITE
+        elif self.occupied_co[chess.BLACK] & BB_SQUARES[square]:
+            return chess.BLACK
+        return None
+
+    def piece_at(self, square: chess.Square):
+        pieceType = self.mailbox[square]
+        return chess.Piece(pieceType, self.color_at(square)) if pieceType else None
+
+    def pieces_mask(self, piece_type: chess.PieceType, color: chess.Color):
+        return self.bitboards[piece_type] & self.occupied_co[color]
+
+    def pieces(self, piece_type: chess.PieceType, color: chess.Color):
+        return chess.SquareSet(self.bitboards[piece_type] & self.occupied_co[color])
+
+    def king(self, color: chess.Color):
+        mask = self.bitboards[KING] & self.occupied_co[color]
+        return mask.bit_length() - 1 if mask else None
+
+    def ply(self):
+        return 2 * (self.fullmove_number - 1) + (self.turn == chess.BLACK)
+
+    def has_kingside_castling_rights(self, color: chess.Color):
+        return bool(self.castling_rights & (chess.BB_H1 if color else chess.BB_H8))
+
+    def has_queenside_castling_rights(self, color: chess.Color):
+        return bool(self.castling_rights & (chess.BB_A1 if color else chess.BB_A8))
+
+    # Attacks
+
+    def attacks_mask(self, square: chess.Square):
+        pieceType = self.mailbox[square]
+        if pieceType == chess.PAWN:
+            return PAWN_ATTACKS[bool(self.occupied_co[chess.WHITE] & BB_SQUARES[square])][square]
+        elif pieceType == chess.KNIGHT:
+            return KNIGHT_ATTACKS[square]
+        elif pieceType == chess.KING:
+            return KING_ATTACKS[square]
+        attacks = 0
+        if pieceType == chess.BISHOP or pieceType == chess.QUEEN:
+            attacks = DIAG_ATTACKS[square][DIAG_MASKS[square] & self.occupied]
+        if pieceType == chess.ROOK or pieceType == chess.QUEEN:
+            attacks |= RANK_ATTACKS[square][RANK_MASKS[square] & self.occupied] | \
+                       FILE_ATTACKS[square][FILE_MASKS[square] & self.occupied]
+        return attacks
+
+    def attackers_mask(self, color: chess.Color, square: chess.Square, occupied=None):
+        if occupied is None:
+            occupied = self.occupied
+        bitboards = self.bitboards
+        theirs = self.occupied_co[color]
+        attackers = (KING_ATTACKS[square] & bitboards[KING] | KNIGHT_ATTACKS[square] & bitboards[KNIGHT]
+                     | PAWN_ATTACKS[not color][square] & bitboards[PAWN]) & theirs
+        # sliders are only looked up if one is on a line through the square
+        queens = bitboards[QUEEN] & theirs
+        rooks = (bitboards[ROOK] & theirs | queens) & ROOK_LINES[square]
+        if rooks:
+            attackers |= (RANK_ATTACKS[square][RANK_MASKS[square] & occupied]
+                          | FILE_ATTACKS[square][FILE_MASKS[square] & occupied]) & rooks
+        bishops = (bitboards[BISHOP] & theirs | queens) & BISHOP_LINES[square]
+        if bishops:
+            attackers |= DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied] & bishops
+        return attackers
+
+    def attackers(self, color: chess.Color, square: chess.Square):
+        return chess.SquareSet(self.attackers_mask(color, square))
+
+    def is_attacked_by(self, color: chess.Color, square: chess.Square):
+        return bool(self.attackers_mask(color, square))
+
+    def checkers_mask(self):
+        king = self.king(self.turn)
+        return 0 if king is None else self.attackers_mask(not self.turn, king)
+
+    def is_check(self):
+        return bool(self.checkers_mask())
+
+    def pin_mask(self, color: chess.Color, square: chess.Square):
+        king = self.king(color)
+        if king is None:
+            return BB_ALL
+        squareMask = BB_SQUARES[square]
+        for attacks, sliders in [(FILE_ATTACKS, self.bitboards[chess.ROOK] | self.bitboards[chess.QUEEN]),
+                                 (RANK_ATTACKS, self.bitboards[chess.ROOK] | self.bitboards[chess.QUEEN]),
+                                 (DIAG_ATTACKS, self.bitboards[chess.BISHOP] | self.bitboards[chess.QUEEN])]:
+            lines = attacks[king][0]
+            if lines & squareMask:
+                snipers = lines & sliders & self.occupied_co[not color]
+                while snipers:
+                    sniper = snipers.bit_length() - 1
+                    snipers ^= BB_SQUARES[sniper]
+                    if BETWEEN[sniper][king] & (self.occupied | squareMask) == squareMask:
+                        return RAYS[king][sniper]
+                break
+        return BB_ALL
+
+    def is_pinned(self, color: chess.Color, square: chess.Square):
+        return self.pin_mask(color, square) != BB_ALL
+
+    def slider_blockers(self, king: chess.Square, color: chess.Color = None):
+        """Our pieces (those of `color`, by default the side to move) that are the only piece
+        between our king and an enemy slider."""
+        if color is None:
+            color = self.turn
+        bitboards = self.bitboards
+        snipers = ((RANK_ATTACKS[king][0] | FILE_ATTACKS[king][0]) & (bitboards[chess.ROOK] | bitboards[chess.QUEEN])) | \
+                  (DIAG_ATTACKS[king][0] & (bitboards[chess.BISHOP] | bitboards[chess.QUEEN]))
+        snipers &= self.occupied_co[not color]
+        blockers = 0
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= BB_SQUARES[sniper]
+            b = BETWEEN[king][sniper] & self.occupied
+            if b and b & (b - 1) == 0:
+                blockers |= b
+        return blockers & self.occupied_co[color]
+
+    # Move properties
+
+    def is_capture(self, move: chess.Move):
+        return bool(BB_SQUARES[move.to_square] & self.occupied_co[not self.turn]) or self.is_en_passant(move)
+
+    def is_en_passant(self, move: chess.Move):
+        return self.ep_square == move.to_square and self.mailbox[move.from_square] == chess.PAWN \
+            and abs(move.to_square - move.from_square) in (7, 9) and not self.mailbox[move.to_square]
+
+    def is_castling(self, move: chess.Move):
+        return self.mailbox[move.from_square] == chess.KING and abs(move.to_square - move.from_square) == 2
+
+    def is_kingside_castling(self, move: chess.Move):
+        return self.is_castling(move) and move.to_square > move.from_square
+
+    def is_zeroing(self, move: chess.Move):
+        return self.mailbox[move.from_square] == chess.PAWN or bool(BB_SQUARES[move.to_square] & self.occupied_co[not self.turn])
+
+    # Make / unmake
+
+    def set_piece(self, square: chess.Square, pieceType: chess.PieceType, color: chess.Color):
+        bb = BB_SQUARES[square]
+        self.bitboards[pieceType] |= bb
+        self.occupied_co[color] |= bb
+        self.occupied |= bb
+        self.mailbox[square] = pieceType
+
+    def clear_piece(self, square: chess.Square, pieceType: chess.PieceType, color: chess.Color):
+        bb = ~BB_SQUARES[square]
+        self.bitboards[pieceType] &= bb
+        self.occupied_co[color] &= bb
+        self.occupied &= bb
+        self.mailbox[square] = 0
+
+    def push(self, move: chess.Move):
+        """Make a (pseudo-legal or null) move."""
+        us = self.turn; them = not us
+        key = self.key
+        castlingRights = self.castling_rights
+        epSquare = self.ep_square
+        halfmoveClock = self.halfmove_clock
+        captured = 0; captureSquare = None
+
+        self.ep_square = None
+        self.halfmove_clock += 1
+        if us == chess.BLACK:
+            self.fullmove_number += 1
+
+        if move:
+            fr = move.from_square; to = move.to_square
+            pieceType = self.mailbox[fr]
+            ourKeys = PIECE_KEYS[us]
+
+            captured = self.mailbox[to]
+            if captured:
+                captureSquare = to
+            elif pieceType == chess.PAWN and to == epSquare and (to - fr) & 1:
+                captureSquare = to - 8 if us else to + 8
+                captured = chess.PAWN
+            if captured:
+                self.clear_piece(captureSquare, captured, them)
+                key ^= PIECE_KEYS[them][captured][captureSquare]
+            if captured or pieceType == chess.PAWN:
+                self.halfmove_clock = 0
+
+            self.clear_piece(fr, pieceType, us)
+            newType = move.promotion or pieceType
+            self.set_piece(to, newType, us)
+            key ^= ourKeys[pieceType][fr] ^ ourKeys[newType][to]
+
+            if pieceType == chess.PAWN and abs(to - fr) == 16:
+                self.ep_square = (fr + to) // 2
+            elif pieceType == chess.KING and abs(to - fr) == 2:
+                # castling: move the rook too
+                rookFrom, rookTo = (to + 1, to - 1) if to > fr else (to - 2, to + 1)
+                self.clear_piece(rookFrom, chess.ROOK, us)
+                self.set_piece(rookTo, chess.ROOK, us)
+                key ^= ourKeys[chess.ROOK][rookFrom] ^ ourKeys[chess.ROOK][rookTo]
+
+            if castlingRights:
+                rights = castlingRights & ~BB_SQUARES[fr] & ~BB_SQUARES[to]
+                if pieceType == chess.KING:
+                    rights &= ~(chess.BB_RANK_1 if us else chess.BB_RANK_8)
+                if rights != castlingRights:
+                    key ^= castling_key(castlingRights) ^ castling_key(rights)
+                    self.castling_rights = rights
+
+        self.stack.append((move, captured, captureSquare, castlingRights, epSquare, halfmoveClock, self.key))
+        self.key = key ^ TURN_KEY
+        self.turn = them
+
+    def pop(self):
+        """Unmake the last move, and return it."""
+        move, captured, captureSquare, castlingRights, epSquare, halfmoveClock, key = self.stack.pop()
+        self.turn = us = not self.turn
+        if us == chess.BLACK:
+            self.fullmove_number -= 1
+
+        if move:
+            fr = move.from_square; to = move.to_square
+            pieceType = self.mailbox[to]
+            self.clear_piece(to, pieceType, us)
+            self.set_piece(fr, chess.PAWN if move.promotion else pieceType, us)
+            if captured:
+                self.set_piece(captureSquare, captured, not us)
+            if pieceType == chess.KING and abs(to - fr) == 2:
+                rookFrom, rookTo = (to + 1, to - 1) if to > fr else (to - 2, to + 1)
+                self.clear_piece(rookTo, chess.ROOK, us)
+                self.set_piece(rookFrom, chess.ROOK, us)
+
+        self.castling_rights = castlingRights
+        self.ep_square = epSquare
+        self.halfmove_clock = halfmoveClock
+        self.key = key
+        return move
+
+    # Move generation. Moves come in the same order as from python-chess, as the move
+    # ordering keeps the generation order between moves of equal score.
+
+    def generate_pseudo_legal(self, from_mask: int, to_mask: int, king: int, blockers: int, moves: list):
+        """Append the legal moves among the pseudo-legal moves from `from_mask` to `to_mask`.
+        Only valid when not in check, or for the non-king moves out of a single check:
+        pinned pieces (`blockers`) stay on the line of their pin, and the king avoids attacked squares."""
+        us = self.turn; them = not us
+        ours = self.occupied_co[us]
+        occupied = self.occupied
+        bitboards = self.bitboards
+        mailbox = self.mailbox
+
+        # piece moves
+        nonPawns = ours & ~bitboards[chess.PAWN] & from_mask
+        while nonPawns:
+            fr = nonPawns.bit_length() - 1
+            nonPawns ^= BB_SQUARES[fr]
+            pieceType = mailbox[fr]
+            row = MOVES[fr]
+            if pieceType == chess.KING:
+                targets = KING_ATTACKS[fr] & ~ours & to_mask
+                while targets:
+                    to = targets.bit_length() - 1
+                    targets ^= BB_SQUARES[to]
+                    if not self.attackers_mask(them, to):
+                        moves.append(row[to])
+                continue
+            if pieceType == chess.KNIGHT:
+                targets = KNIGHT_ATTACKS[fr]
+            else:
+                targets = 0
+                if pieceType != chess.ROOK:
+                    targets = DIAG_ATTACKS[fr][DIAG_MASKS[fr] & occupied]
+                if pieceType != chess.BISHOP:
+                    targets |= RANK_ATTACKS[fr][RANK_MASKS[fr] & occupied] | FILE_ATTACKS[fr][FILE_MASKS[fr] & occupied]
+            targets &= ~ours & to_mask
+            if blockers & BB_SQUARES[fr]:
+                targets &= RAYS[king][fr]
+            while targets:
+                to = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to]
+                moves.append(row[to])
+
+        # castling
+        if self.castling_rights and ours & bitboards[chess.KING] & from_mask:
+            self.generate_castling(king, to_mask, moves)
+
+        # pawn captures, then single and double pushes
+        pawns = ours & bitboards[chess.PAWN] & from_mask
+        if pawns:
+            theirs = self.occupied_co[them]
+            attacks = PAWN_ATTACKS[us]
+            capturers = pawns
+            while capturers:
+                fr = capturers.bit_length() - 1
+                capturers ^= BB_SQUARES[fr]
+                targets = attacks[fr] & theirs & to_mask
+                if blockers & BB_SQUARES[fr]:
+                    targets &= RAYS[king][fr]
+                while targets:
+                    to = targets.bit_length() - 1
+                    targets ^= BB_SQUARES[to]
+                    if to < 8 or to >= 56:
+                        moves.extend(PROMOTIONS[fr][to])
+                    else:
+                        moves.append(MOVES[fr][to])
+
+            if us == chess.WHITE:
+                singles = pawns << 8 & ~occupied
+                doubles = singles << 8 & ~occupied & chess.BB_RANK_4
+                back = -8
+            else:
+                singles = pawns >> 8 & ~occupied
+                doubles = singles >> 8 & ~occupied & chess.BB_RANK_5
+                back = 8
+            singles &= to_mask
+            doubles &= to_mask
+
+            while singles:
+                to = singles.bit_length() - 1
+                singles ^= BB_SQUARES[to]
+                fr = to + back
+                if blockers & BB_SQUARES[fr] and not RAYS[king][fr] & BB_SQUARES[to]:
+                    continue
+                if to < 8 or to >= 56:
+                    moves.extend(PROMOTIONS[fr][to])
+                else:
+                    moves.append(MOVES[fr][to])
+            while doubles:
+                to = doubles.bit_length() - 1
+                doubles ^= BB_SQUARES[to]
+                fr = to + 2 * back
+                if blockers & BB_SQUARES[fr] and not RAYS[king][fr] & BB_SQUARES[to]:
+                    continue
+                moves.append(MOVES[fr][to])
+
+        # en passant
+        if self.ep_square is not None and BB_SQUARES[self.ep_square] & to_mask:
+            self.generate_en_passant(from_mask, moves)
+
+    def generate_castling(self, king: int, to_mask: int, moves: list):
+        them = not self.turn
+        backrank = chess.BB_RANK_1 if self.turn else chess.BB_RANK_8
+        candidates = self.castling_rights & backrank & to_mask
+        occupied = self.occupied ^ BB_SQUARES[king]
+        while candidates:
+            rook = candidates.bit_length() - 1
+            candidates ^= BB_SQUARES[rook]
+            kingTo = king - 2 if rook < king else king + 2
+            if BETWEEN[king][rook] & self.occupied:
+                continue
+            if self.attackers_mask(them, king, occupied) or self.attackers_mask(them, (king + kingTo) // 2, occupied) \
+                    or self.attackers_mask(them, kingTo, occupied):
+                continue
+            moves.append(MOVES[king][kingTo])
+
+    def generate_en_passant(self, from_mask: int, moves: list):
+        """Append the legal en passant captures. They are rare, so they are simply made to test them."""
+        ep = self.ep_square
+        if self.mailbox[ep]:
+            return
+        us = self.turn
+        capturers = self.bitboards[chess.PAWN] & self.occupied_co[us] & from_mask & PAWN_ATTACKS[not us][ep] \
+            & chess.BB_RANKS[4 if us else 3]
+        while capturers:
+            fr = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[fr]
+            move = MOVES[fr][ep]
+            self.push(move)
+            king = self.king(us)
+            legal = not self.attackers_mask(not us, king)
+            self.pop()
+            if legal:
+                moves.append(move)
+
+    def generate_legal_moves(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        """Return the list of legal moves."""
+        us = self.turn
+        king = self.king(us)
+        blockers = self.slider_blockers(king)
+        checkers = self.attackers_mask(not us, king)
+        moves = []
+        if not checkers:
+            self.generate_pseudo_legal(from_mask, to_mask, king, blockers, moves)
+            return moves
+
+        # Evasions: king moves first, off the lines of the checking sliders
+        attacked = 0
+        sliders = checkers & (self.bitboards[chess.BISHOP] | self.bitboards[chess.ROOK] | self.bitboards[chess.QUEEN])
+        while sliders:
+            checker = sliders.bit_length() - 1
+            sliders ^= BB_SQUARES[checker]
+            attacked |= RAYS[king][checker] & ~BB_SQUARES[checker]
+        if BB_SQUARES[king] & from_mask:
+            targets = KING_ATTACKS[king] & ~self.occupied_co[us] & ~attacked & to_mask
+            while targets:
+                to = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to]
+                if not self.attackers_mask(not us, to):
+                    moves.append(MOVES[king][to])
+
+        # then captures of a single checker, and blocks
+        checker = checkers.bit_length() - 1
+        if BB_SQUARES[checker] == checkers:
+            target = BETWEEN[king][checker] | checkers
+            self.generate_pseudo_legal(~self.bitboards[chess.KING] & from_mask, target & to_mask, king, blockers, moves)
+            # capturing the checking pawn en passant
+            ep = self.ep_square
+            if ep is not None and BB_SQUARES[ep] & to_mask and not BB_SQUARES[ep] & target \
+                    and ep + (-8 if us else 8) == checker:
+                self.generate_en_passant(from_mask, moves)
+        return moves
+
+    @property
+    def legal_moves(self):
+        """The legal moves, as a new list. The last position's moves are remembered, as the search
+        asks for them several times (game over test, move loop)."""
+        cacheKey, cacheEp, moves = self.legal_cache
+        if cacheKey != self.key or cacheEp != self.ep_square:
+            moves = self.generate_legal_moves()
+            self.legal_cache = (self.key, self.ep_square, moves)
+        return list(moves)
+
+    def generate_legal_captures(self):
+        """Return the legal captures, including en passant, without generating the other moves."""
+        moves = self.generate_legal_moves(BB_ALL, self.occupied_co[not self.turn])
+        if self.ep_square is not None:
+            # a pawn can only reach the empty en passant square by capturing
+            pawns = self.bitboards[chess.PAWN] & self.occupied_co[self.turn]
+            moves.extend(self.generate_legal_moves(pawns, BB_SQUARES[self.ep_square]))
+        return moves
+
+    # Game end
+
+    def is_checkmate(self):
+        return self.is_check() and not self.legal_moves
+
+    def is_stalemate(self):
+        return not self.is_check() and not self.legal_moves
+
+    def has_insufficient_material(self, color: chess.Color):
+        bitboards = self.bitboards
+        ours = self.occupied_co[color]
+        if ours & (bitboards[chess.PAWN] | bitboards[chess.ROOK] | bitboards[chess.QUEEN]):
+            return False
+        if ours & bitboards[chess.KNIGHT]:
+            return chess.popcount(ours) <= 2 and \
+                not (self.occupied_co[not color] & ~bitboards[chess.KING] & ~bitboards[chess.QUEEN])
+        if ours & bitboards[chess.BISHOP]:
+            sameColor = not bitboards[chess.BISHOP] & chess.BB_DARK_SQUARES or \
+                not bitboards[chess.BISHOP] & chess.BB_LIGHT_SQUARES
+            return sameColor and not bitboards[chess.PAWN] and not bitboards[chess.KNIGHT]
+        return True
+
+    def is_insufficient_material(self):
+        return self.has_insufficient_material(chess.WHITE) and self.has_insufficient_material(chess.BLACK)
+
+    def is_repetition(self, count: int = 3):
+        """Whether the position occurred `count` times, since the last capture or pawn move."""
+        n = 1
+        for ply in range(2, min(self.halfmove_clock, len(self.stack)) + 1, 2):
+            if self.stack[-ply][6] == self.key:
+                n += 1
+                if n >= count:
+                    return True
+        return False
+
+    def is_game_over(self):
+        """Checkmate, stalemate, insufficient material, or the automatic draws
+        (75-move rule and fivefold repetition), as chess.Board.is_game_over()."""
+        if not self.legal_moves:
+            return True
+        return self.is_insufficient_material() or self.halfmove_clock >= 150 or self.is_repetition(5)
@@ -0,0 +1,111 @@
+# Strategos chess engine, written in Python.
+
+# book.py contains the Polyglot opening book.
+# A Polyglot .bin file is a sorted array of 16-byte entries (key, move, weight, learn),
+# big-endian, keyed by the Polyglot Zobrist hash (bitboard.Board.zobrist).
+# The file is memory-mapped and binary-searched, so it is never read into memory:
+# a probe touches only the few pages around the position's entries.
+
+import mmap
+import random
+import struct
+
+import bitboard
+from engine_types import *
+
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+
+class Book:
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            self.data = b""
+        self.size = len(self.data) // ENTRY.size
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def key_at(self, i: int):
+        return KEY.unpack_from(self.data, i * ENTRY.size)[0]
+
+    def find(self, key: int):
+        """Return the index of the first entry with a key not less than `key`."""
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def entries(self, key: int):
+        """Yield the (raw move, weight) of every entry of the position."""
+        i = self.find(key)
+        while i < self.size:
+            entryKey, rawMove, weight, _ = ENTRY.unpack_from(self.data, i * ENTRY.size)
+            if entryKey != key:
+                break
+            yield rawMove, weight
+            i += 1
+
+    @staticmethod
+    def decode(board: bitboard.Board, rawMove: int):
+        """Convert a Polyglot move to a chess.Move on the board.
+        Polyglot encodes promotions as 1-4 (knight to queen), and castling as the king capturing its rook."""
+        to_square = rawMove & 63
+        from_square = (rawMove >> 6) & 63
+        promotion = (rawMove >> 12) & 7
+        if promotion:
+            return chess.Move(from_square, to_square, promotion + 1)
+
+        if board.piece_type_at(from_square) == chess.KING and board.color_at(to_square) == board.turn \
+                and board.piece_type_at(to_square) == chess.ROOK:
+            to_square = to_square + 2 if to_square < from_square else to_square - 1
+        return chess.Move(from_square, to_square)
+
+    def moves(self, board: bitboard.Board):
+        """Return the legal book moves of the position, as a list of (move, weight)."""
+        legal = set(board.legal_moves)
+        moves = []
+        for rawMove, weight in self.entries(board.zobrist()):
+            move = self.decode(board, rawMove)
+            if move in legal:
+                moves.append((move, weight))
+        return moves
+
+    def choose(self, board: bitboard.Board, best: bool = False):
+        """Return a book move, picked at random in proportion to the weights,
+        or the move with the highest weight. None if the position is not in the book."""
+        moves = [(move, weight) for move, weight in self.moves(board) if weight > 0]
+        if not moves:
+            return None
+        if best:
+            return max(moves, key=lambda entry: entry[1])[0]
+        return random.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+book = None
+
+def open_book(path: str):
+    """Open the book file, or close the book if the path is empty."""
+    global book
+    if book is not None:
+        book.close()
+    book = None
+    if path and path != "<empty>":
+        try:
+            book = Book(path)
+        except OSError as e:
+            print(f"info string cannot open book {path}: {e}")
+
+def probe(pos):
+    """Return a book move for the position if the book is enabled (UCI option OwnBook), or None."""
+    if book is None or not config.OWN_BOOK:
+        return None
+    return book.choose(pos.board, config.BOOK_BEST_MOVE)
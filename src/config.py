@@ -5,4 +5,37 @@
 ENGINE_NAME = "Strategos"
 ENGINE_AUTHOR = "Muzhen J"
 
-USE_ONLINE_TABLEBASE: bool = False  # Set to True to enable access to the online tablebase.
\ No newline at end of file
+USE_ONLINE_TABLEBASE: bool = False  # Set to True to enable access to the online tablebase.
+HASH_SIZE: int = 16  # Size of the transposition table in MB (UCI option "Hash").
+EVAL_CACHE_SIZE: int = 65536  # Maximum number of positions kept in the evaluation cache.
+THREADS: int = 1  # Number of search processes (UCI option "Threads").
+MOVE_OVERHEAD: int = 50  # Time in ms kept in reserve for communication delays (UCI option "Move Overhead").
+SYZYGY_PATH: str = ""  # Directories with Syzygy tablebase files, separated like PATH (UCI option "SyzygyPath").
+TABLEBASE_CACHE_SIZE: int = 65536  # Maximum number of tablebase probe results kept in memory.
+ONLINE_TABLEBASE_URL: str = "http://tablebase.lichess.ovh/standard"  # Any server with the lila-tablebase API.
+ONLINE_TABLEBASE_TIMEOUT: float = 2.0  # Seconds to wait for an online tablebase request.
+ONLINE_TABLEBASE_RETRY: float = 60.0  # After a failed request, seconds before the online tablebase is tried again.
+ANALYSIS_CACHE_PATH: str = ""  # SQLite file keeping root analysis across sessions, empty to disable (UCI option "AnalysisCache").
+ANALYSIS_CACHE_SIZE: int = 1000000  # Maximum number of positions in the analysis cache (UCI option "AnalysisCacheSize").
+ANALYSIS_CACHE_SEED: bool = True  # Load the analysis cache into the transposition table (UCI option "AnalysisCacheSeed").
+OWN_BOOK: bool = False  # Play moves from the opening book (UCI option "OwnBook").
+BOOK_FILE: str = ""  # Polyglot .bin opening book (UCI option "BookFile").
+BOOK_BEST_MOVE: bool = False  # Play the book move with the highest weight instead of a weighted random one (UCI option "BestBookMove").
+STATS: bool = False  # Collect search and evaluation statistics, at some cost in speed (UCI option "Stats").
+# Selective search (see search.py), each with a UCI option of the name given
+REVERSE_FUTILITY: bool = True  # "ReverseFutility"
+REVERSE_FUTILITY_MARGIN: int = 120  # "ReverseFutilityMargin", in centipawns per ply of depth
+REVERSE_FUTILITY_DEPTH: int = 6  # "ReverseFutilityDepth", the maximum depth
+NULL_MOVE: bool = True  # "NullMove"
+NULL_MOVE_REDUCTION: int = 3  # "NullMoveReduction", plus one per 6 plies of depth
+FUTILITY: bool = True  # "Futility"
+FUTILITY_MARGIN: int = 150  # "FutilityMargin", in centipawns per ply of depth
+FUTILITY_DEPTH: int = 3  # "FutilityDepth", the maximum depth
+LMR: bool = True  # "LMR", late move reductions
+LMR_BASE: int = 75  # "LMRBase", in hundredths: reduction = base + log(depth) * log(move number) / divisor
+LMR_DIVISOR: int = 225  # "LMRDivisor", in hundredths
+CHECK_EXTENSION: bool = True  # "CheckExtension"
+# Evaluate the children of depth 1 nodes in one NumPy batch (UCI option "BatchEval").
+# Experimental: the scores are the same, but the search is slower than with the scalar evaluation.
+BATCH_EVAL: bool = False
+PROFILE_FILE: str = "strategos.prof"  # File written by `go ... profile`, in cProfile (pstats) format.
@@ -1,31 +1,155 @@
 # Strategos chess engine, written in Python.
 
-# endgame.py contains the endgame evaluation function.
-# It uses an online tablebase to evaluate positions with <= 7 pieces.
-# We currently use the lila tablebase hosted by lichess.org.
+# endgame.py contains the endgame tablebase probing.
+# Local Syzygy tables (UCI option SyzygyPath) are probed through chess.syzygy:
+# WDL probes inside the search, and DTZ probes to choose between the root moves.
+# If config.USE_ONLINE_TABLEBASE is set, positions missing from the local tables are
+# looked up in the lila tablebase hosted by lichess.org, or any server with the same API.
+# Every probe result is kept in an LRU cache, as the same endgames are probed over and over.
 
+import os
+import time
+
+import chess.syzygy
+import evalcache
 import position
+import stats
 from engine_types import *
 
-def query_tablebase(pos: position.Position, side_to_move: chess.Color):
+tablebase = None
+max_pieces = 0  # largest number of pieces covered by the local tables
+
+tbhits = 0  # number of successful probes in the current search
+
+# WDL values are from side to move's POV: 2 win, 1 cursed win (drawn by the 50-move rule),
+# 0 draw, -1 blessed loss, -2 loss. UNKNOWN is cached for positions no tablebase knows.
+UNKNOWN = 3
+cache = evalcache.EvalCache(config.TABLEBASE_CACHE_SIZE)
+
+session = None  # requests.Session, so that connections to the online tablebase are reused
+online_retry_time = 0  # after a failed request, the online tablebase is not used until then
+
+def open_tablebase(path: str):
+    """Open the Syzygy tables in the given directories (separated like PATH). An empty path disables them."""
+    global tablebase, max_pieces
+    if tablebase is not None:
+        tablebase.close()
+    tablebase = None
+    max_pieces = 0
+    cache.clear()
+    # evaluations cached without these tables (or with others) must not be used with them
+    evalcache.cache.clear()
+
+    directories = [directory for directory in path.split(os.pathsep) if directory and directory != "<empty>"]
+    if not directories:
+        return
+
+    tablebase = chess.syzygy.Tablebase()
+    for directory in directories:
+        tablebase.add_directory(directory)
+    # table names look like "KQvKR"
+    max_pieces = max([len(name) - 1 for name in tablebase.wdl], default=0)
+
+def new_search():
+    global tbhits
+    tbhits = 0
+
+def probe_local(board: chess.Board):
+    if tablebase is None or chess.popcount(board.occupied) > max_pieces:
+        return None
+    return tablebase.get_wdl(board)
+
+def query_tablebase(board: chess.Board):
     """Query the online tablebase for the position."""
     """https://github.com/lichess-org/lila-tablebase"""
+    global session, online_retry_time
+    if time.time() < online_retry_time:
+        return None
+
+    try:
+        import requests
+        if session is None:
+            session = requests.Session()
+        r = session.get(config.ONLINE_TABLEBASE_URL, params={"fen": board.fen()},
+                        timeout=config.ONLINE_TABLEBASE_TIMEOUT)
+        r.raise_for_status()
+        category = r.json()["category"]
+    except Exception:
+        # no network, or the server is down: don't slow every probe down waiting for it
+        online_retry_time = time.time() + config.ONLINE_TABLEBASE_RETRY
+        return None
+
+    return {"win": 2, "maybe-win": 2, "cursed-win": 1, "draw": 0,
+            "blessed-loss": -1, "maybe-loss": -2, "loss": -2}.get(category)
+
+def probe_wdl(pos: position.Position):
+    """Return the WDL value of the position from side to move's POV, or None if it is not known."""
+    global tbhits
+    if tablebase is None and not config.USE_ONLINE_TABLEBASE:
+        return None
     
-    # We assume that config.USE_ONLINE_TABLEBASE is True when this function is called.
-    import requests
-    
-    FEN = pos.fen()
-    LINK = "http://tablebase.lichess.ovh/standard?fen=" + FEN
-    r = requests.get(LINK)  # if this fails, then the user should disable USE_ONLINE_TABLEBASE
-    j = r.json()
-    
-    eval_ = j["category"] # "win", "loss", "draw"
-    
-    if eval_ == "win":
-        return VALUE_MATE + j["dtm"]
-    elif eval_ == "loss":
-        return -(VALUE_MATE + j["dtm"])
-    else:
-        return VALUE_DRAW
-
-    
\ No newline at end of file
+    board = pos.board
+    if board.castling_rights or chess.popcount(board.occupied) > max(max_pieces, 7 if config.USE_ONLINE_TABLEBASE else 0):
+        return None
+
+    key = pos.key()
+    wdl = cache.get(key)
+    if wdl is None:
+        if stats.enabled:
+            stats.count("tbprobes")
+        board = board.chess_board()  # the tablebases need a chess.Board
+        wdl = probe_local(board)
+        if wdl is None and config.USE_ONLINE_TABLEBASE and chess.popcount(board.occupied) <= 7:
+            wdl = query_tablebase(board)
+        if wdl is None:
+            wdl = UNKNOWN
+        cache.put(key, wdl)
+
+    if wdl == UNKNOWN:
+        return None
+    tbhits += 1
+    return wdl
+
+def wdl_to_score(wdl: int, ply: int = 0):
+    """Convert a WDL value to a search score. Wins found sooner score higher."""
+    if wdl == 2:
+        return VALUE_TB_WIN - ply
+    elif wdl == -2:
+        return -VALUE_TB_WIN + ply
+    return VALUE_DRAW + wdl  # cursed wins and blessed losses are draws
+
+def probe_score(pos: position.Position, ply: int = 0):
+    """Return the tablebase score of the position from side to move's POV, or None."""
+    wdl = probe_wdl(pos)
+    return None if wdl is None else wdl_to_score(wdl, ply)
+
+def filter_root_moves(pos: position.Position):
+    """If the root position is in the local tables, return the moves that keep its best WDL value
+    (and the quickest DTZ when winning, so that the win can't run into the 50-move rule).
+    Return None if the tables can't be used."""
+    global tbhits
+    board = pos.board.chess_board()
+    if probe_local(board) is None or board.castling_rights:
+        return None
+
+    results = []
+    for move in board.legal_moves:
+        zeroing = board.is_zeroing(move)
+        board.push(move)
+        wdl = tablebase.get_wdl(board)
+        dtz = tablebase.get_dtz(board)
+        board.pop()
+        if wdl is None or dtz is None:
+            return None
+        # a winning capture or pawn move resets the 50-move counter, which is the best we can do
+        results.append((move, -wdl, 0 if zeroing and wdl < 0 else -dtz))
+
+    bestWdl = max(wdl for _, wdl, _ in results)
+    moves = [(move, dtz) for move, wdl, dtz in results if wdl == bestWdl]
+    if bestWdl > 0:
+        # the opponent's DTZ after our move is negative when we win: closest to zero is quickest
+        bestDtz = min(abs(dtz) for _, dtz in moves)
+        moves = [(move, dtz) for move, dtz in moves if abs(dtz) == bestDtz]
+
+    tbhits += len(results)
+    return [move for move, _ in moves]
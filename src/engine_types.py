@@ -16,10 +16,12 @@ MIDDLEGAME = 0; ENDGAME = 1
 PIECE_TYPES = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
 
 # 4. Evaluation values
-VALUE_INF = 1000000; VALUE_MATE = 10000001; VALUE_MATED = -10000001; VALUE_DRAW = 0; VALUE_NONE = None
+VALUE_INF = 20000000; VALUE_MATE = 10000001; VALUE_MATED = -10000001; VALUE_DRAW = 0; VALUE_NONE = None
+VALUE_TB_WIN = 500000  # tablebase wins score below mates, but above any evaluation
 
 # 5. Depth
 MAX_DEPTH = 64
+MAX_PLY = 256  # mate scores are VALUE_MATE + MAX_PLY - ply, so that mates are found within this many plies
 
 def material_(piece, phase=MIDDLEGAME):
     """Return the material value of a piece, in middlegame/endgame values depending on the phase."""
@@ -0,0 +1,156 @@
+# Strategos chess engine, written in Python.
+
+# epd.py contains the EPD test-suite runner, to measure how fast the engine solves tactics.
+# Every line of an EPD file is a position with operations: `bm` (the best moves, one of which
+# has to be played), `am` (moves to avoid) and `id`. The positions are searched in parallel worker
+# processes, each under a node or time budget. From the info line of every iteration, we take
+# the time and nodes at which the engine found a right move and kept it until the end of the search.
+#   epd <file> [nodes <n>] [movetime <ms>] [workers <n>] [json <file>]
+
+import contextlib
+import io
+import json
+import os
+import time
+
+import analysiscache
+import benchmark
+import position
+import search
+import smp
+import timeman
+from engine_types import *
+
+# budget of each position when neither nodes nor movetime is given
+DEFAULT_MOVETIME = 1000
+
+def load(path: str):
+    """Return the positions of an EPD file as dicts: id, fen, bm and am (lists of UCI moves)."""
+    tests = []
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip() or line.startswith("#"):
+                continue
+            board, operations = chess.Board.from_epd(line)
+            tests.append({"id": operations.get("id", f"line {number}"), "fen": board.fen(),
+                          "bm": sorted(move.uci() for move in operations.get("bm", [])),
+                          "am": sorted(move.uci() for move in operations.get("am", []))})
+    return tests
+
+def is_right(test: dict, move: str):
+    if test["bm"] and move not in test["bm"]:
+        return False
+    return move not in test["am"]
+
+def init_worker():
+    """Every worker searches on its own: one thread, no shared hash, and no result from
+    the analysis cache, the book or the online tablebase, which would skip the search."""
+    smp.set_threads(1)
+    analysiscache.cache = None
+    config.OWN_BOOK = False
+    config.USE_ONLINE_TABLEBASE = False
+
+def search_position(fen: str, limits: timeman.Limits):
+    """Search a position from a clean state, without printing anything.
+    Return the best move (UCI string), the info line of every finished iteration as a list of tokens,
+    and the time taken in ms."""
+    benchmark.reset_state()
+    pos = position.Position(fen)
+    output = io.StringIO()
+    start = time.time()
+    with contextlib.redirect_stdout(output):
+        bestMove = search.iterative_deepening(pos, MAX_DEPTH, pos.side_to_move, limits=limits)
+    totalTime = round((time.time() - start) * 1000)
+
+    iterations = []
+    for line in output.getvalue().splitlines():
+        tokens = line.split(" ")
+        if tokens[0] == "info" and "depth" in tokens and "pv" in tokens[:-1]:
+            iterations.append(tokens)
+    return bestMove, iterations, totalTime
+
+def solve(test: dict, nodes: int = None, movetime: int = None):
+    """Search a test position, and return the test with its result: the best move, whether it is
+    right, and the depth, time (ms) and nodes at which the right move was found and kept."""
+    limits = timeman.Limits()
+    limits.nodes = nodes
+    limits.movetime = movetime
+    bestMove, iterations, totalTime = search_position(test["fen"], limits)
+
+    # the iteration from which the best move was right until the end
+    found = None
+    depth = 0
+    for tokens in iterations:
+        pv = tokens[tokens.index("pv") + 1:]
+        depth = int(tokens[tokens.index("depth") + 1])
+        if not is_right(test, pv[0]):
+            found = None
+        elif found is None:
+            found = {field: int(tokens[tokens.index(field) + 1]) for field in ["depth", "time", "nodes"]}
+
+    result = dict(test, bestmove=bestMove, solved=bestMove is not None and is_right(test, bestMove),
+                  totaltime=totalTime, totalnodes=search.nodes)
+    if result["solved"]:
+        # if no finished iteration kept it, the last (unfinished) one found it
+        result.update(found or {"depth": depth + 1, "time": totalTime, "nodes": search.nodes})
+    return result
+
+def solve_task(task: tuple):
+    return solve(*task)
+
+def run(path: str, nodes: int = None, movetime: int = None, workers: int = None, json_file: str = None):
+    """Handle the `epd` command: solve the positions of the file and print the results."""
+    tests = load(path)
+    if nodes is None and movetime is None:
+        movetime = DEFAULT_MOVETIME
+    workers = min(workers or os.cpu_count() or 1, len(tests)) or 1
+    budget = f"nodes {nodes}" if nodes is not None else f"movetime {movetime}"
+    print(f"info string {len(tests)} positions, {budget}, {workers} workers")
+
+    tasks = [(test, nodes, movetime) for test in tests]
+    ctx = smp.context()
+    start = time.time()
+    results = []
+    if ctx is None or workers == 1:
+        # in this process, with the same settings as a worker
+        saved = (config.THREADS, analysiscache.cache, config.OWN_BOOK, config.USE_ONLINE_TABLEBASE)
+        init_worker()
+        try:
+            for task in tasks:
+                results.append(report(solve_task(task), len(results) + 1, len(tests)))
+        finally:
+            threads, analysiscache.cache, config.OWN_BOOK, config.USE_ONLINE_TABLEBASE = saved
+            smp.set_threads(threads)
+    else:
+        with ctx.Pool(workers, initializer=init_worker) as pool:
+            for result in pool.imap_unordered(solve_task, tasks):
+                results.append(report(result, len(results) + 1, len(tests)))
+    wallTime = time.time() - start
+
+    solved = [result for result in results if result["solved"]]
+    print(f"\nSolved: {len(solved)}/{len(results)}")
+    if solved:
+        print(f"Time to solution: total {sum(result['time'] for result in solved) / 1000:.2f}s "
+              f"average {sum(result['time'] for result in solved) / len(solved) / 1000:.3f}s")
+        print(f"Nodes to solution: total {sum(result['nodes'] for result in solved)} "
+              f"average {sum(result['nodes'] for result in solved) // len(solved)}")
+    print(f"Nodes searched: {sum(result['totalnodes'] for result in results)}")
+    print(f"Time taken: {round(wallTime, 2)}s")
+
+    if json_file is not None:
+        order = {test["id"]: i for i, test in enumerate(tests)}
+        results.sort(key=lambda result: order[result["id"]])
+        with open(json_file, "w") as f:
+            json.dump({"file": path, "nodes": nodes, "movetime": movetime, "solved": len(solved),
+                       "positions": results}, f, indent=2)
+        print(f"Report written to {json_file}")
+
+def report(result: dict, number: int, total: int):
+    """Print the result of one position as it arrives, and return it."""
+    expected = " ".join(f"{op} {' '.join(result[op])}" for op in ["bm", "am"] if result[op])
+    line = f"{number:4}/{total} {'solved' if result['solved'] else 'FAILED'} {result['id']}: {expected}, " \
+           f"played {result['bestmove']}"
+    if result["solved"]:
+        line += f", found at depth {result['depth']} time {result['time']}ms nodes {result['nodes']}"
+    print(line)
+    return result
@@ -82,23 +82,27 @@ def psqt(pieceType: chess.PieceType):
         return KING_PSQT
     return None
 
+# PSQ[color][pieceType][square] is the (middlegame, endgame) bonus for a piece on a square,
+# with the tables flipped for black. It is used to update the PSQT sums kept by Position.
+PSQ = [[None] * 7, [None] * 7]
+for pieceType in PIECE_TYPES:
+    PSQ[chess.WHITE][pieceType] = [psqt(pieceType)[chess.square_rank(square)][chess.square_file(square)]
+                                   for square in chess.SQUARES]
+    PSQ[chess.BLACK][pieceType] = [psqt(pieceType)[7 - chess.square_rank(square)][chess.square_file(square)]
+                                   for square in chess.SQUARES]
+
 def eval_psqt_single(square: chess.Square, pieceType: chess.PieceType, side: chess.Color, phase=MIDDLEGAME):
     return psqt(pieceType)[7 - chess.square_rank(square)][chess.square_file(square)][phase]
 def eval_psqt_piece(pos: position.Position, side: chess.Color, pieceType: chess.PieceType, phase):
     score = 0
-    chess_board = pos.board.chess_board()
-    for square in chess.SQUARES:
-        piece = chess_board.piece_at(square)
-        # if the side is black, flip the psqt
-        if piece and piece.piece_type == pieceType and piece.color == side:
-            if side == chess.BLACK:
-                score += psqt(pieceType)[7 - chess.square_rank(square)][chess.square_file(square)][phase]
-            else:
-                score += psqt(pieceType)[chess.square_rank(square)][chess.square_file(square)][phase]
+    for square in pos.board.pieces(pieceType, side):
+        score += PSQ[side][pieceType][square][phase]
     return score
 
 def eval_psqt(pos: position.Position, side: chess.Color, phase):
+    """Compute the PSQT score from scratch.
+    During search, use Position.psqt() instead, which is updated incrementally."""
     score = 0
     for pieceType in chess.PIECE_TYPES:
         score += eval_psqt_piece(pos, side, pieceType, phase)
-    return score
\ No newline at end of file
+    return score
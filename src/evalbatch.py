@@ -0,0 +1,152 @@
+# Strategos chess engine, written in Python.
+
+# evalbatch.py contains the batched evaluation.
+# A batch of positions is encoded as piece planes (one 0/1 array of 64 squares per
+# color and piece type), and the material, PSQT and pawn structure terms are computed
+# for the whole batch with NumPy array operations. The terms that depend on piece
+# interactions (hanging pieces, pins, attacks) are still computed one position at a time.
+# The result is exactly evaluate.evaluate_uncached() for every position.
+# NumPy is optional: without it, positions are evaluated one by one.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import attacks
+import eval_psqt
+import evalcache
+import evaluate
+import endgame
+import position
+import stats
+from engine_types import *
+
+COLORS = [chess.BLACK, chess.WHITE]
+
+def available():
+    return np is not None
+
+if np is not None:
+    # Plane p = color * 6 + pieceType - 1
+    MATERIAL_MG = np.array([material_(pieceType, MIDDLEGAME) for color in COLORS for pieceType in PIECE_TYPES])
+    PSQ_TABLES = np.array([[[eval_psqt.PSQ[color][pieceType][square][phase] for square in chess.SQUARES]
+                            for color in COLORS for pieceType in PIECE_TYPES] for phase in [MIDDLEGAME, ENDGAME]])
+    SQUARE_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+    RANKS = np.arange(8)
+
+def piece_masks(board):
+    """The 12 piece bitboards of a board, in plane order."""
+    return [board.bitboards[pieceType] & board.occupied_co[color] for color in COLORS for pieceType in PIECE_TYPES]
+
+def encode(masks: list):
+    """Return the piece planes of a batch of piece_masks(), as an array of shape (batch, 12, 64)."""
+    masks = np.array(masks, dtype=np.uint64)
+    return ((masks[:, :, None] & SQUARE_BITS) != 0).astype(np.int64)
+
+def game_phase(planes):
+    """Position.game_phase() for every position of the batch."""
+    materialMg = planes.sum(axis=2) @ MATERIAL_MG
+    return np.where(materialMg < QUEEN_VALUE_EG * 2, ENDGAME, MIDDLEGAME)
+
+def material(planes, side_to_move, phase):
+    """Steps 1 and 2 of the evaluation: material (always with middlegame values,
+    like Position.material()) and the PSQT of the game phase, from side to move's POV."""
+    counts = planes.sum(axis=2)
+    white = counts[:, 6:] @ MATERIAL_MG[6:]
+    black = counts[:, :6] @ MATERIAL_MG[:6]
+
+    psqtMg = np.einsum("bps,ps->bp", planes, PSQ_TABLES[MIDDLEGAME])
+    psqtEg = np.einsum("bps,ps->bp", planes, PSQ_TABLES[ENDGAME])
+    psqt = np.where((phase == MIDDLEGAME)[:, None], psqtMg, psqtEg)
+    white = white + psqt[:, 6:].sum(axis=1)
+    black = black + psqt[:, :6].sum(axis=1)
+    return np.where(side_to_move, white - black, black - white)
+
+def neighbours(values, fill, reduce):
+    """Reduce the values of the two files adjacent to each file."""
+    padded = np.pad(values, ((0, 0), (1, 1)), constant_values=fill)
+    return reduce(padded[:, :-2], padded[:, 2:])
+
+def passed(white, black):
+    """Passed pawns as in pawns.passed_pawns(): a pawn is passed unless an enemy pawn on its own
+    or an adjacent file stands on its rank or behind it, or if it is on the 7th rank.
+    Takes and returns pawn planes of shape (batch, rank, file)."""
+    ranks = RANKS[None, :, None]
+    # lowest black pawn and highest white pawn on each file
+    lowest = np.where(black.any(axis=1), black.argmax(axis=1), 8)
+    lowest = np.minimum(lowest, neighbours(lowest, 8, np.minimum))
+    highest = np.where(white.any(axis=1), 7 - white[:, ::-1].argmax(axis=1), -1)
+    highest = np.maximum(highest, neighbours(highest, -1, np.maximum))
+    whitePassed = white & ((ranks < lowest[:, None, :]) | (ranks == 6))
+    blackPassed = black & ((ranks > highest[:, None, :]) | (ranks == 1))
+    return whitePassed, blackPassed
+
+def pawn_structure(planes, side_to_move):
+    """Steps 4 and 5 of the evaluation (evaluate.pawn_eval() in the endgame), from side to move's POV."""
+    white = planes[:, 6].reshape(-1, 8, 8).astype(bool)  # (batch, rank, file)
+    black = planes[:, 0].reshape(-1, 8, 8).astype(bool)
+
+    # passed pawns score 100 per rank advanced, for us, and against them
+    whitePassed, blackPassed = passed(white, black)
+    ranks = RANKS[None, :, None]
+    v = 100 * (whitePassed * ranks).sum(axis=(1, 2)) - 100 * (blackPassed * (7 - ranks)).sum(axis=(1, 2))
+
+    def doubled(pawns):
+        files = pawns.sum(axis=1)
+        return (files * (files - 1)).sum(axis=1)
+
+    def isolated(pawns):
+        files = pawns.sum(axis=1)
+        return ((files == 1) & (neighbours(files, 0, np.add) == 0)).sum(axis=1)
+
+    v += -35 * (doubled(white) - doubled(black)) - 60 * (isolated(white) - isolated(black))
+    return np.where(side_to_move, v, -v)
+
+def evaluate_batch(masks: list, side_to_move: list):
+    """Material, PSQT and pawn structure of a batch of piece_masks(), from each side to move's POV."""
+    planes = encode(masks)
+    side_to_move = np.array(side_to_move, dtype=bool)
+    phase = game_phase(planes)
+    v = material(planes, side_to_move, phase)
+    endgames = phase == ENDGAME
+    if endgames.any():
+        v = v + np.where(endgames, pawn_structure(planes, side_to_move), 0)
+    return v.tolist()
+
+def prefill(pos: position.Position, moves: list, perspectives):
+    """Evaluate the positions after each move in one batch, from each of the given sides' POV,
+    and store them in the evaluation cache, where the search will find them."""
+    if np is None:
+        return
+    masks = []; sides = []; keys = []; rest = []
+    for move in moves:
+        pos.push(move)
+        board = pos.board
+        if endgame.probe_score(pos) is None:
+            phase = pos.game_phase()
+            info = None  # shared by both perspectives
+            for side in perspectives:
+                key = pos.key() << 1 | side
+                if key in evalcache.cache.entries:
+                    continue
+                # the terms that are not batched, in the order evaluate_uncached() adds them
+                if info is None:
+                    info = attacks.AttackInfo(board)
+                hanging = evaluate.hanging_eval(info, side, phase) - evaluate.hanging_eval(info, not side, phase)
+                terms = []
+                if phase == MIDDLEGAME:
+                    terms = list(evaluate.pin_terms(info, side, phase)) + list(evaluate.attack_terms(info, side, phase))
+                masks.append(piece_masks(board)); sides.append(side)
+                keys.append(key); rest.append((hanging, terms))
+        pos.pop()
+
+    if not masks:
+        return
+    if stats.enabled:
+        stats.count("evals", len(masks))
+    for key, v, (hanging, terms) in zip(keys, evaluate_batch(masks, sides), rest):
+        v += hanging
+        for term in terms:
+            v += term
+        evalcache.cache.put(key, v)
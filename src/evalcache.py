@@ -0,0 +1,45 @@
+# Strategos chess engine, written in Python.
+
+# evalcache.py contains the evaluation cache.
+# Static evaluations are stored by Zobrist key and perspective, so that a position
+# evaluated by search() (for pruning), qsearch() (stand pat) and evalbatch.prefill() is only evaluated once.
+
+from collections import OrderedDict
+from engine_types import *
+
+class EvalCache:
+    def __init__(self, size: int = 65536):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = self.misses = 0
+
+    def get(self, key: int):
+        """Return the cached evaluation, or None. Hits become the most recently used entry."""
+        v = self.entries.get(key)
+        if v is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return v
+
+    def put(self, key: int, v):
+        """Store an evaluation, evicting the least recently used entry if the cache is full."""
+        self.entries[key] = v
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """Return a summary of the hit/miss statistics, for an `info string` line."""
+        total = self.hits + self.misses
+        rate = round(100 * self.hits / total, 1) if total else 0
+        return f"evalcache hits {self.hits} misses {self.misses} hitrate {rate}% entries {len(self.entries)}"
+
+cache = EvalCache(config.EVAL_CACHE_SIZE)
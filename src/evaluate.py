@@ -2,152 +2,212 @@
 
 # evaluate.py contains the evaluation function for the engine.
 
+import attacks
+import bitboard
 import position
 from engine_types import *
-import eval_psqt
-import pieces
+import pawns
 import endgame
+import evalcache
+import stats
+import time
 
 def evaluate(pos: position.Position, side_to_move: chess.Color):
+    """Evaluate the position from side to move's POV, using the evaluation cache."""
+    if stats.enabled:
+        stats.count("evaluate")
+    key = pos.key() << 1 | side_to_move
+    v = evalcache.cache.get(key)
+    if v is None:
+        v = evaluate_uncached(pos, side_to_move)
+        evalcache.cache.put(key, v)
+    return v
+
+def evaluate_uncached(pos: position.Position, side_to_move: chess.Color):
     """Evaluate the position from side to move's POV."""
-    
-    # Step 0. If <= 7 pieces, use an endgame tablebase in endgame.py.
-    if config.USE_ONLINE_TABLEBASE and pos.count_all_pieces() <= 7:
-        return endgame.query_tablebase(pos, side_to_move)
+    timing = stats.enabled
+    if timing:
+        stats.count("evals")
+        t = time.perf_counter()
+    
+    # Step 0. If the position is in an endgame tablebase, use its result (see endgame.py).
+    tbScore = endgame.probe_score(pos)
+    if timing:
+        t = stats.lap("tablebase", t)
+    if tbScore is not None:
+        return tbScore if side_to_move == pos.board.turn else -tbScore
     
     # Step 1. Material evaluation.
-    board = pos.board.chess_board()
+    # Material and PSQT sums are kept up to date by Position.push() and Position.pop().
+    board = pos.board
+    phase = pos.game_phase()
     US_MATERIAL = pos.material(side_to_move)
     THEM_MATERIAL = pos.material(not side_to_move)
         
     materialEval = US_MATERIAL - THEM_MATERIAL
+    if timing:
+        t = stats.lap("material", t)
     
     # Step 2. Piece-square bonuses.
-    psqtEval = eval_psqt.eval_psqt(pos, side_to_move, pos.game_phase()) \
-               - eval_psqt.eval_psqt(pos, not side_to_move, pos.game_phase())
+    psqtEval = pos.psqt(side_to_move, phase) - pos.psqt(not side_to_move, phase)
+    if timing:
+        t = stats.lap("psqt", t)
     
-    # Step 3. Treat hanging pieces as if they were material.
-    hangingEval = 0
-    for move in list(board.legal_moves):
-        if board.is_capture(move):
-            try:
-                capturingPieceV = material_(board.piece_at(move.from_square).piece_type, pos.game_phase())
-                capturedPieceV = material_(board.piece_at(move.to_square).piece_type, pos.game_phase())
-            except AttributeError:
-                continue
-            if capturedPieceV > capturingPieceV or board.attackers(not side_to_move, move.to_square).__len__() == 0:
-                hangingEval += capturedPieceV - capturingPieceV
-                
-                # additionally, if the capturingPiece is a pawn, we add a large bonus
-                if board.piece_at(move.from_square).piece_type == chess.PAWN:
-                    hangingEval += 100
-                    
-                # also, if the capturingPiece is not attacked after the capture,
-                # we do not subtract its value from the hangingEval
-                if not board.is_attacked_by(not side_to_move, move.to_square):
-                    hangingEval += capturingPieceV
+    # The attacks of both sides, shared by the terms below.
+    info = attacks.AttackInfo(board)
+    if timing:
+        t = stats.lap("attackinfo", t)
     
-    v = materialEval + psqtEval + hangingEval
+    # Step 3. Treat hanging pieces as if they were material.
+    v = materialEval + psqtEval + hanging_eval(info, side_to_move, phase)
     
     # Step 3.5 Check if WE are hanging material too.
-    hangingEval = 0
-    # First do a null move.
-    board.push(chess.Move.null())
-    for move in list(board.legal_moves):
-        if board.is_capture(move):
-            try:
-                capturingPieceV = material_(board.piece_at(move.from_square).piece_type, pos.game_phase())
-                capturedPieceV = material_(board.piece_at(move.to_square).piece_type, pos.game_phase())
-            except AttributeError:
-                continue
-                
-            if capturedPieceV > capturingPieceV or board.attackers(side_to_move, move.to_square).__len__() == 0:
-                hangingEval -= capturedPieceV - capturingPieceV
-                
-                # additionally, if the capturingPiece is a pawn, we add a large bonus
-                if board.piece_at(move.from_square).piece_type == chess.PAWN:
-                    hangingEval -= 100
+    v -= hanging_eval(info, not side_to_move, phase)
+    if timing:
+        t = stats.lap("hanging", t)
+    
+    # Steps 4-5. Pawn structure, only in the endgame.
+    if phase == ENDGAME:
+        v += pawn_eval(board, side_to_move, phase)
+        if timing:
+            t = stats.lap("pawns", t)
+    
+    # Steps 6-7. Pins and multiple attacks, only in the middlegame.
+    # The terms are fractions: they are added one by one, in a fixed order,
+    # so that evalbatch.py can reproduce the floating-point result exactly.
+    if phase == MIDDLEGAME:
+        for term in pin_terms(info, side_to_move, phase):
+            v += term
+        if timing:
+            t = stats.lap("pins", t)
+        for term in attack_terms(info, side_to_move, phase):
+            v += term
+        if timing:
+            stats.lap("attacks", t)
                     
-                # also, if the capturingPiece is not attacked after the capture,
-                # we do not subtract its value from the hangingEval
-                if not board.is_attacked_by(side_to_move, move.to_square):
-                    hangingEval -= capturingPieceV
-                    
-    board.pop()  # unmake the null move
-    v -= hangingEval
+    return v
+
+def pawn_eval(board: bitboard.Board, side_to_move: chess.Color, phase):
+    """Passed, doubled and isolated pawns, from side to move's POV."""
+    v = 0
     
     # Step 4. Bonus for passed pawns.
-    if pos.game_phase() == ENDGAME:
-        for pawn in board.pieces(chess.PAWN, side_to_move):
-            if pieces.pawn_passed(pos, pawn, side_to_move):
-                # The more advanced the pawn is, the more valuable it is.
-                v += 100 * chess.square_rank(pawn) if side_to_move == chess.WHITE\
-                    else 100 * (7 - chess.square_rank(pawn))
-                
-        # similarly do the same for the enemy pawns, but subtract the value
-        for pawn in board.pieces(chess.PAWN, not side_to_move):
-            if pieces.pawn_passed(pos, pawn, not side_to_move):
-                v -= 100 * (7 - chess.square_rank(pawn)) if side_to_move == chess.WHITE\
-                    else 100 * chess.square_rank(pawn)
+    for pawn in chess.scan_forward(pawns.passed_pawns(board, side_to_move)):
+        # The more advanced the pawn is, the more valuable it is.
+        v += 100 * chess.square_rank(pawn) if side_to_move == chess.WHITE\
+            else 100 * (7 - chess.square_rank(pawn))
+            
+    # similarly do the same for the enemy pawns, but subtract the value
+    for pawn in chess.scan_forward(pawns.passed_pawns(board, not side_to_move)):
+        v -= 100 * (7 - chess.square_rank(pawn)) if side_to_move == chess.WHITE\
+            else 100 * chess.square_rank(pawn)
     
     # Step 5. Penalty for doubled and isolated pawns.
-    # Check only in endgame.
-        for side in [side_to_move, not side_to_move]:
-            for pawn in pos.doubled_pawns(side):
-                v += (15 if pos.game_phase() == MIDDLEGAME else 35) * (1 if side != side_to_move else -1)
-        
-        for side in [side_to_move, not side_to_move]:
-            for pawn in pos.isolated_pawns(side):
-                v += (15 if pos.game_phase() == MIDDLEGAME else 60) * (1 if side != side_to_move else -1)
+    for side in [side_to_move, not side_to_move]:
+        v += (15 if phase == MIDDLEGAME else 35) * (1 if side != side_to_move else -1) \
+             * pawns.doubled_count(board, side)
     
-    # Step 6. Penalty for pinned pieces, and bonus for pinning pieces.
-    # Check only in middlegame.
-    if pos.game_phase() == MIDDLEGAME:
-        for pieceType in PIECE_TYPES:
-            for piece in board.pieces(pieceType, side_to_move):
-                if board.is_pinned(side_to_move, piece):
-                   v -= material_(pieceType, pos.game_phase()) / 3
-                   if board.attackers(not side_to_move, piece).__len__() >= 1:
-                       v -= material_(pieceType, pos.game_phase()) / 2
-            for piece in board.pieces(pieceType, not side_to_move):
-                if board.is_pinned(not side_to_move, piece):
-                    v += material_(pieceType, pos.game_phase()) / 3
-                    if board.attackers(side_to_move, piece).__len__() >= 1:
-                        v += material_(pieceType, pos.game_phase()) / 2
-    
-        # Step 7. Bonus for attacking a piece multiple times
-        for color in [side_to_move, not side_to_move]:
-            for pieceType in PIECE_TYPES:
-                for piece in board.pieces(pieceType, not color):
-                    if board.attackers(color, piece).__len__() >= 2:
-                        v += material_(pieceType, pos.game_phase()) / 4 * (1 if color == side_to_move else -1)
-                    
+    for side in [side_to_move, not side_to_move]:
+        v += (15 if phase == MIDDLEGAME else 60) * (1 if side != side_to_move else -1) \
+             * chess.popcount(pawns.isolated_pawns(board, side))
     return v
 
+def pin_terms(info: attacks.AttackInfo, side_to_move: chess.Color, phase):
+    """Step 6. Penalty for pinned pieces, and bonus for pinning pieces."""
+    board = info.board
+    for pieceType in PIECE_TYPES:
+        for piece in chess.scan_forward(board.pieces_mask(pieceType, side_to_move) & info.pinned[side_to_move]):
+            yield -material_(pieceType, phase) / 3
+            if info.attackers[not side_to_move][piece]:
+                yield -material_(pieceType, phase) / 2
+        for piece in chess.scan_forward(board.pieces_mask(pieceType, not side_to_move) & info.pinned[not side_to_move]):
+            yield material_(pieceType, phase) / 3
+            if info.attackers[side_to_move][piece]:
+                yield material_(pieceType, phase) / 2
 
-def see_eval(pos: position.Position, side_to_move: chess.Color, capture: chess.Move):
-    # TODO: Fix error at "pos.board.chess_board().pop()"
-    """Return the static exchange evaluation of a capture."""
-    
-    capturingPiece = pos.board.chess_board().piece_at(capture.from_square)
-    capturedPiece = pos.board.chess_board().piece_at(capture.to_square)
-    
-    if capturedPiece is None:
-        return 0  # this should only happen for en passant captures, which is PAWN takes PAWN = 0.
-    
-    capturingV = material_(capturingPiece.piece_type, pos.game_phase())
-    capturedV = material_(capturedPiece.piece_type, pos.game_phase())
-    
-    if capturingV > capturedV and pos.board.chess_board().attackers(
-            not side_to_move, capture.to_square).__len__() >= 1:
-        return capturedV - capturingV  # negative
-    
-    # make the capture
-    pos.board.chess_board().push(capture)
-    e = evaluate(pos, side_to_move)
-    pos.board.chess_board().pop()
+def attack_terms(info: attacks.AttackInfo, side_to_move: chess.Color, phase):
+    """Step 7. Bonus for attacking a piece multiple times."""
+    board = info.board
+    for color in [side_to_move, not side_to_move]:
+        for pieceType in PIECE_TYPES:
+            for piece in chess.scan_forward(board.pieces_mask(pieceType, not color)):
+                if info.count(color, piece) >= 2:
+                    yield material_(pieceType, phase) / 4 * (1 if color == side_to_move else -1)
+
+
+def hanging_eval(info: attacks.AttackInfo, color: chess.Color, phase):
+    """Value of the pieces `color` can capture profitably, as if they were material.
+    Captures are found from the attackers of each enemy piece, without generating moves."""
+    board = info.board
+    hangingEval = 0
+    enemies = board.occupied_co[not color] & ~board.kings & info.attacked[color]
+    for square in chess.scan_forward(enemies):
+        capturedPieceV = material_(board.piece_type_at(square), phase)
+        defended = info.attackers[not color][square]
+        
+        for attacker in chess.scan_forward(info.attackers[color][square]):
+            capturingPiece = board.piece_type_at(attacker)
+            capturingPieceV = material_(capturingPiece, phase)
+            if capturedPieceV > capturingPieceV or not defended:
+                hangingEval += capturedPieceV - capturingPieceV
+                
+                # additionally, if the capturingPiece is a pawn, we add a large bonus
+                if capturingPiece == chess.PAWN:
+                    hangingEval += 100
+                    
+                # also, if the capturingPiece is not attacked after the capture,
+                # we do not subtract its value from the hangingEval
+                if not defended:
+                    hangingEval += capturingPieceV
     
-    if e > 0:
-        return capturedV - capturingV
+    return hangingEval
+
+def see_eval(pos: position.Position, side_to_move: chess.Color, capture: chess.Move):
+    """Return the static exchange evaluation of a capture: the material won or lost
+    if both sides keep recapturing on the target square with their least valuable piece,
+    and either side may stop recapturing when it is not profitable.
+    Pieces that move off the square's lines reveal x-ray attackers behind them."""
+    board = pos.board
+    phase = pos.game_phase()
+    target = capture.to_square
+    
+    if board.is_en_passant(capture):
+        capturedPiece = chess.PAWN
+        occupied = board.occupied ^ chess.BB_SQUARES[target + (-8 if board.turn == chess.WHITE else 8)]
     else:
-        return capturedV - capturingV + e  # penalty for negative eval after capture
\ No newline at end of file
+        capturedPiece = board.piece_type_at(target)
+        occupied = board.occupied
+        if capturedPiece is None:
+            return 0  # not a capture
+    
+    # gain[d] is the material balance after the d-th capture, from the capturing side's POV
+    gain = [material_(capturedPiece, phase)]
+    attacker = board.piece_type_at(capture.from_square)
+    occupied ^= chess.BB_SQUARES[capture.from_square]
+    color = not board.turn
+    
+    while True:
+        attackers = board.attackers_mask(color, target, occupied) & occupied
+        if not attackers:
+            break
+        
+        # recapture with the least valuable attacker
+        for pieceType in PIECE_TYPES:
+            candidates = attackers & board.pieces_mask(pieceType, color)
+            if candidates:
+                break
+        
+        gain.append(material_(attacker, phase) - gain[-1])
+        if max(-gain[-2], gain[-1]) < 0:
+            gain.pop()
+            break  # this recapture can't change the outcome
+        
+        attacker = pieceType
+        occupied ^= chess.BB_SQUARES[chess.lsb(candidates)]
+        color = not color
+    
+    # each side chooses between recapturing and stopping, from the end of the sequence
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
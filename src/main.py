@@ -1,11 +1,19 @@
 # Strategos chess engine, written in Python.
 
 # main.py contains the main function for the engine.
+#   python main.py              UCI interface
+#   python main.py analyze ...  batch analysis of a file of positions (see analyze.py)
 
+import sys
+
+import analyze
 import uci
 
 def main():
-    uci.uci()
+    if sys.argv[1:2] == ["analyze"]:
+        analyze.main(sys.argv[2:])
+    else:
+        uci.uci()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,463 @@
+# Strategos chess engine, written in Python.
+
+# match.py contains the engine-vs-engine match runner, to check that a change (a speedup, a new
+# search feature) does not make the engine weaker. It plays games between two engines, for example
+# the working tree and an older checkout, each a `main.py` process driven over UCI, several games
+# at a time. Every opening is played twice, with colors reversed. The result is reported as an Elo
+# difference with 95% error bars and an SPRT verdict, and the games are written as PGN.
+#   python match.py --engine2 ../../old/src/main.py --games 200 --nodes 5000
+#   python match.py --engine2 ../../old/src/main.py --tc 10+0.1 --concurrency 8 --sprt 0 5 --pgn games.pgn
+#   python match.py --option1 Threads=2 --depth 4 --openings openings.epd
+
+import argparse
+import concurrent.futures
+import datetime
+import math
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import chess
+import chess.pgn
+
+# Openings played when no --openings file is given, as moves from the starting position.
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6", "e2e4 c7c5 g1f3 d7d6", "e2e4 e7e6 d2d4 d7d5", "e2e4 c7c6 d2d4 d7d5",
+    "e2e4 e7e5 f1c4 g8f6", "e2e4 d7d5 e4d5 d8d5", "e2e4 g7g6 d2d4 f8g7", "e2e4 c7c5 b1c3 b8c6",
+    "d2d4 d7d5 c2c4 e7e6", "d2d4 d7d5 c2c4 c7c6", "d2d4 g8f6 c2c4 g7g6", "d2d4 g8f6 c2c4 e7e6",
+    "d2d4 f7f5 g2g3 g8f6", "c2c4 e7e5 b1c3 g8f6", "c2c4 c7c5 g1f3 b8c6", "g1f3 d7d5 g2g3 g8f6",
+]
+
+# Scores used for adjudication, in centipawns; mate scores count as MATE_SCORE.
+MATE_SCORE = 100000
+
+# seconds an engine has to answer `uci` and `isready`
+READY_TIMEOUT = 30
+
+class EngineError(Exception):
+    pass
+
+class EngineTimeout(EngineError):
+    pass
+
+class Engine:
+    """A UCI engine process. Its output is read by a thread, so that reads can time out.
+    After an error (crash, timeout) the engine is marked as failed, and has to be restarted."""
+    def __init__(self, path: str, options: list):
+        path = os.path.abspath(path)
+        command = [sys.executable, path] if path.endswith(".py") else [path]
+        self.process = subprocess.Popen(command, cwd=os.path.dirname(path), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self.failed = False
+        self.lines = queue.Queue()
+        threading.Thread(target=self.reader, daemon=True).start()
+        self.send("uci")
+        self.wait_for("uciok")
+        for name, value in options:
+            self.send(f"setoption name {name} value {value}")
+        self.ready()
+
+    def send(self, command: str):
+        try:
+            self.process.stdin.write(command + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            self.failed = True
+            raise EngineError(f"cannot write to the engine: {e}")
+
+    def reader(self):
+        for line in self.process.stdout:
+            self.lines.put(line)
+        self.lines.put(None)
+
+    def read(self, deadline: float = None):
+        """Return the next line, waiting at most until `deadline` (time.monotonic())."""
+        try:
+            line = self.lines.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            self.failed = True
+            raise EngineTimeout("the engine did not answer in time")
+        if line is None:
+            self.failed = True
+            raise EngineError("the engine exited")
+        return line.strip()
+
+    def wait_for(self, token: str):
+        """Read lines until one starts with `token`, and return it."""
+        deadline = time.monotonic() + READY_TIMEOUT
+        while True:
+            line = self.read(deadline)
+            if line.split(" ")[0] == token:
+                return line
+
+    def ready(self):
+        self.send("isready")
+        self.wait_for("readyok")
+
+    def new_game(self):
+        self.send("ucinewgame")
+        self.ready()
+
+    def go(self, position: str, go: str, timeout: float = None):
+        """Search the position, and return the best move (UCI string) and the last reported score
+        from the engine's POV (None if it did not report one). Raise EngineTimeout if the best move
+        does not come within `timeout` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.send(position)
+        self.send(go)
+        score = None
+        while True:
+            tokens = self.read(deadline).split(" ")
+            if tokens[0] == "bestmove":
+                return (tokens[1] if len(tokens) > 1 else "0000"), score
+            if tokens[0] == "info" and "score" in tokens:
+                i = tokens.index("score")
+                if i + 2 < len(tokens) and tokens[i + 2].lstrip("-").isdigit():
+                    value = int(tokens[i + 2])
+                    if tokens[i + 1] == "cp":
+                        score = value
+                    elif tokens[i + 1] == "mate":
+                        score = MATE_SCORE if value > 0 else -MATE_SCORE
+
+    def quit(self):
+        if not self.failed:
+            try:
+                self.send("quit")
+                self.process.wait(timeout=5)
+                return
+            except (EngineError, subprocess.TimeoutExpired):
+                pass
+        self.process.kill()
+        self.process.wait()
+
+# Statistics
+
+def score_to_elo(score: float):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+def elo_to_score(elo: float):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def score_stats(wins: int, draws: int, losses: int):
+    """Mean and variance of the score of a game."""
+    n = wins + draws + losses
+    score = (wins + draws / 2) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    return score, variance
+
+def elo(wins: int, draws: int, losses: int):
+    """Return the Elo difference and the half-width of its 95% confidence interval."""
+    if wins + draws + losses == 0:
+        return 0.0, 0.0
+    score, variance = score_stats(wins, draws, losses)
+    margin = 1.959964 * math.sqrt(variance / (wins + draws + losses))
+    return score_to_elo(score), (score_to_elo(score + margin) - score_to_elo(score - margin)) / 2
+
+def llr(wins: int, draws: int, losses: int, elo0: float, elo1: float):
+    """Log-likelihood ratio of the hypotheses elo1 against elo0 (logistic Elo),
+    with the normal approximation of the generalized SPRT."""
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0
+    score, variance = score_stats(wins, draws, losses)
+    if variance == 0:
+        return 0.0
+    s0, s1 = elo_to_score(elo0), elo_to_score(elo1)
+    return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+def sprt_bounds(alpha: float, beta: float):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+# Games
+
+def load_openings(path: str):
+    """Return the openings as (FEN, moves): the built-in ones, or the FEN/EPD lines of a file."""
+    if not path:
+        return [(chess.STARTING_FEN, line.split(" ")) for line in OPENINGS]
+    openings = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split(";")[0].split()
+            if len(fields) < 4:
+                continue
+            # EPD lines have operations instead of the move counters
+            counters = fields[4:6] if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit() else ["0", "1"]
+            openings.append((" ".join(fields[:4] + counters), []))
+    return openings
+
+class Adjudicator:
+    """Ends games that are clearly decided (resign) or drawn, from the engines' scores."""
+    def __init__(self, args):
+        self.args = args
+        self.scores = []  # from White's POV, one per ply
+
+    def add(self, board: chess.Board, score):
+        """Record the score of the move just played on `board` (from its mover's POV),
+        and return the result if the game is adjudicated."""
+        args = self.args
+        if score is None:
+            self.scores = []
+            return None
+        self.scores.append(score if board.turn == chess.BLACK else -score)
+        last = self.scores[-2 * args.adjudicate_moves:]
+        if len(last) < 2 * args.adjudicate_moves:
+            return None
+        if all(s >= args.resign_score for s in last):
+            return "1-0"
+        if all(s <= -args.resign_score for s in last):
+            return "0-1"
+        if board.fullmove_number >= args.draw_move and all(abs(s) <= args.draw_score for s in last):
+            return "1/2-1/2"
+        return None
+
+def go_command(args, clocks: list):
+    if args.nodes:
+        return f"go nodes {args.nodes}"
+    if args.depth:
+        return f"go depth {args.depth}"
+    return f"go wtime {round(clocks[chess.WHITE] * 1000)} btime {round(clocks[chess.BLACK] * 1000)} " \
+           f"winc {round(args.increment * 1000)} binc {round(args.increment * 1000)}"
+
+def play_game(engines: dict, opening: tuple, args):
+    """Play one game between engines[chess.WHITE] and engines[chess.BLACK] from the opening.
+    Return the PGN game, with the result and the reason in the headers."""
+    fen, openingMoves = opening
+    board = chess.Board(fen)
+    game = chess.pgn.Game()
+    if fen != chess.STARTING_FEN:
+        game.setup(board)
+    node = game
+    for uci in openingMoves:
+        move = chess.Move.from_uci(uci)
+        node = node.add_variation(move, comment="book" if node is game else "")
+        board.push(move)
+
+    clocks = [args.time, args.time]
+    adjudicator = Adjudicator(args)
+    startMoves = " ".join(openingMoves)
+    result = reason = None
+    moves = []
+    for color, engine in engines.items():
+        try:
+            engine.new_game()
+        except EngineError as e:
+            result, reason = ("0-1" if color == chess.WHITE else "1-0"), f"{e}"
+            break
+    while result is None:
+        outcome = board.outcome(claim_draw=True)
+        if outcome is not None:
+            result = outcome.result()
+            reason = outcome.termination.name.lower().replace("_", " ")
+            break
+        if board.ply() >= args.max_plies:
+            result, reason = "1/2-1/2", "adjudication: maximum length"
+            break
+
+        turn = board.turn
+        engine = engines[turn]
+        position = f"position fen {fen}"
+        if startMoves or moves:
+            position += " moves " + " ".join(([startMoves] if startMoves else []) + moves)
+        timed = not (args.nodes or args.depth)
+        start = time.monotonic()
+        try:
+            uci, score = engine.go(position, go_command(args, clocks),
+                                   clocks[turn] + args.time_margin if timed else None)
+        except EngineTimeout:
+            result, reason = ("0-1" if turn == chess.WHITE else "1-0"), "time forfeit"
+            break
+        except EngineError as e:
+            result, reason = ("0-1" if turn == chess.WHITE else "1-0"), f"{e}"
+            break
+        clocks[turn] -= time.monotonic() - start
+        if timed:
+            if clocks[turn] < -args.time_margin:
+                result, reason = ("0-1" if turn == chess.WHITE else "1-0"), "time forfeit"
+                break
+            clocks[turn] += args.increment
+
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            move = None
+        if move is None or move not in board.legal_moves:
+            result, reason = ("0-1" if turn == chess.WHITE else "1-0"), f"illegal move {uci}"
+            break
+        node = node.add_variation(move, comment=f"{score / 100:+.2f}" if score is not None else "")
+        board.push(move)
+        moves.append(uci)
+
+        adjudicated = adjudicator.add(board, score)
+        if adjudicated is not None:
+            result, reason = adjudicated, "adjudication: score"
+
+    game.headers["Result"] = result
+    game.headers["Termination"] = reason
+    return game
+
+class Match:
+    def __init__(self, args):
+        self.args = args
+        self.openings = load_openings(args.openings)
+        self.wins = self.draws = self.losses = 0
+        self.played = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.local = threading.local()
+        self.engines = []
+        self.elo0, self.elo1 = args.sprt if args.sprt else (None, None)
+        self.bounds = sprt_bounds(args.alpha, args.beta)
+        if args.tc:
+            base, _, increment = args.tc.partition("+")
+            args.time, args.increment = float(base), float(increment or 0)
+        else:
+            args.time, args.increment = 0.0, 0.0
+        self.pgn = open(args.pgn, "a") if args.pgn else None
+
+    def worker_engines(self):
+        """The two engines of the current worker thread, started on first use and kept between games.
+        An engine that failed in the last game (crash, timeout) is replaced by a new process."""
+        args = self.args
+        engines = getattr(self.local, "engines", [None, None])
+        for i, (path, options) in enumerate([(args.engine1, args.option1), (args.engine2, args.option2)]):
+            if engines[i] is not None and not engines[i].failed:
+                continue
+            if engines[i] is not None:
+                engines[i].quit()
+                with self.lock:
+                    self.engines.remove(engines[i])
+            engines[i] = Engine(path, options)
+            with self.lock:
+                self.engines.append(engines[i])
+        self.local.engines = engines
+        return engines
+
+    def play(self, number: int):
+        """Play game `number`: the opening number // 2, with colors reversed in odd games."""
+        if self.stopped.is_set():
+            return
+        args = self.args
+        first, second = self.worker_engines()
+        firstIsWhite = number % 2 == 0
+        engines = {chess.WHITE: first if firstIsWhite else second, chess.BLACK: second if firstIsWhite else first}
+        game = play_game(engines, self.openings[number // 2 % len(self.openings)], args)
+
+        headers = game.headers
+        headers["Event"] = "Strategos match"
+        headers["Site"] = "?"
+        headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+        headers["Round"] = str(number + 1)
+        headers["White"] = args.name1 if firstIsWhite else args.name2
+        headers["Black"] = args.name2 if firstIsWhite else args.name1
+        if args.nodes:
+            headers["TimeControl"] = f"nodes {args.nodes}"
+        elif args.depth:
+            headers["TimeControl"] = f"depth {args.depth}"
+        else:
+            headers["TimeControl"] = f"{args.time:g}+{args.increment:g}"
+
+        result = headers["Result"]
+        with self.lock:
+            if result == "1/2-1/2":
+                self.draws += 1
+            elif (result == "1-0") == firstIsWhite:
+                self.wins += 1
+            else:
+                self.losses += 1
+            self.played += 1
+            if self.pgn is not None:
+                print(game, file=self.pgn, end="\n\n", flush=True)
+            print(f"Game {self.played}/{args.games}: {headers['White']} - {headers['Black']} {result} "
+                  f"({headers['Termination']})   {self.summary()}", flush=True)
+            if self.verdict() is not None:
+                self.stopped.set()
+
+    def summary(self):
+        eloDiff, margin = elo(self.wins, self.draws, self.losses)
+        text = f"W {self.wins} D {self.draws} L {self.losses}   Elo {eloDiff:+.1f} +/- {margin:.1f}"
+        if self.elo0 is not None:
+            text += f"   LLR {llr(self.wins, self.draws, self.losses, self.elo0, self.elo1):.2f} " \
+                    f"({self.bounds[0]:.2f}, {self.bounds[1]:.2f})"
+        return text
+
+    def verdict(self):
+        """H1 if engine1 is at least elo1 stronger, H0 if it is at most elo0 stronger, or None (go on)."""
+        if self.elo0 is None:
+            return None
+        ratio = llr(self.wins, self.draws, self.losses, self.elo0, self.elo1)
+        if ratio >= self.bounds[1]:
+            return "H1"
+        if ratio <= self.bounds[0]:
+            return "H0"
+        return None
+
+    def run(self):
+        args = self.args
+        start = time.time()
+        try:
+            with concurrent.futures.ThreadPoolExecutor(args.concurrency) as executor:
+                for future in [executor.submit(self.play, number) for number in range(args.games)]:
+                    future.result()
+        finally:
+            for engine in self.engines:
+                engine.quit()
+            if self.pgn is not None:
+                self.pgn.close()
+
+        print(f"\n{args.name1} vs {args.name2}: {self.played} games in {round(time.time() - start, 1)}s")
+        print(self.summary())
+        if self.elo0 is not None:
+            verdict = self.verdict()
+            if verdict == "H1":
+                print(f"SPRT: H1 accepted, {args.name1} is at least {self.elo1:g} Elo stronger")
+            elif verdict == "H0":
+                print(f"SPRT: H0 accepted, {args.name1} is at most {self.elo0:g} Elo stronger")
+            else:
+                print("SPRT: no verdict yet, play more games")
+
+def parse_options(options: list):
+    """Convert Name=Value arguments to (name, value) pairs."""
+    return [tuple(option.split("=", 1)) for option in options]
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Play a match between two UCI engines.")
+    parser.add_argument("--engine1", default=os.path.join(here, "main.py"), help="engine under test")
+    parser.add_argument("--engine2", default=os.path.join(here, "main.py"), help="reference engine")
+    parser.add_argument("--name1", default="engine1")
+    parser.add_argument("--name2", default="engine2")
+    parser.add_argument("--option1", nargs="*", default=[], metavar="NAME=VALUE", help="UCI options of engine1")
+    parser.add_argument("--option2", nargs="*", default=[], metavar="NAME=VALUE", help="UCI options of engine2")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="games played at a time")
+    parser.add_argument("--openings", help="FEN/EPD file of opening positions (default: built-in openings)")
+    limits = parser.add_mutually_exclusive_group()
+    limits.add_argument("--nodes", type=int, help="nodes per move")
+    limits.add_argument("--depth", type=int, help="depth per move")
+    limits.add_argument("--tc", help="time control, seconds+increment (default 10+0.1)")
+    parser.add_argument("--time-margin", type=float, default=0.1, help="seconds a clock may go below zero")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"), help="SPRT hypotheses")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--max-plies", type=int, default=400, help="games longer than this are drawn")
+    parser.add_argument("--adjudicate-moves", type=int, default=4,
+                        help="moves by each side that have to agree for the score adjudication")
+    parser.add_argument("--resign-score", type=int, default=800)
+    parser.add_argument("--draw-score", type=int, default=10)
+    parser.add_argument("--draw-move", type=int, default=40, help="first move number of draw adjudication")
+    parser.add_argument("--pgn", help="file the games are appended to")
+    args = parser.parse_args()
+    if not (args.nodes or args.depth or args.tc):
+        args.tc = "10+0.1"
+    args.option1 = parse_options(args.option1)
+    args.option2 = parse_options(args.option2)
+    if args.games % 2:
+        args.games += 1  # every opening is played with both colors
+    Match(args).run()
+
+if __name__ == "__main__":
+    main()
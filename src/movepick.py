@@ -0,0 +1,120 @@
+# Strategos chess engine, written in Python.
+
+# movepick.py contains the move ordering for the search.
+# Moves are searched in this order: the hash move, captures sorted by MVV-LVA
+# (most valuable victim, least valuable attacker), the two killer moves of the ply,
+# and finally quiet moves sorted by the history heuristic.
+# pick_moves() generates the moves in stages, in that order: each stage is only generated
+# when the previous ones have been searched, so a node that cuts off on the hash move or
+# a capture never generates its quiet moves.
+
+import bitboard
+from engine_types import *
+
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+PROMOTION_SCORE = 1 << 23
+KILLER_SCORES = [1 << 22, (1 << 22) - 1]
+HISTORY_MAX = 1 << 20
+
+# killers[ply] holds the last two quiet moves that caused a beta cutoff at that ply.
+killers = [[None, None] for _ in range(MAX_PLY + 1)]
+
+# history[color][from * 64 + to] is increased each time a quiet move causes a beta cutoff.
+history = [[0] * 4096, [0] * 4096]
+
+def new_search():
+    """Reset the killers and age the history table, at the start of every search."""
+    global killers
+    killers = [[None, None] for _ in range(MAX_PLY + 1)]
+    for table in history:
+        for i in range(4096):
+            table[i] >>= 1
+
+def clear():
+    global killers, history
+    killers = [[None, None] for _ in range(MAX_PLY + 1)]
+    history = [[0] * 4096, [0] * 4096]
+
+def mvv_lva(board: bitboard.Board, move: chess.Move):
+    victim = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+    return 10 * victim - board.piece_type_at(move.from_square)
+
+def score_move(board: bitboard.Board, move: chess.Move, ttMove: chess.Move, ply: int):
+    if move == ttMove:
+        return HASH_MOVE_SCORE
+    if board.is_capture(move):
+        return CAPTURE_SCORE + mvv_lva(board, move)
+    if move.promotion:
+        return PROMOTION_SCORE + move.promotion
+    if move == killers[ply][0]:
+        return KILLER_SCORES[0]
+    if move == killers[ply][1]:
+        return KILLER_SCORES[1]
+    return history[board.turn][move.from_square * 64 + move.to_square]
+
+def order_moves(board: bitboard.Board, moves: list, ttMove: chess.Move = None, ply: int = 0):
+    """Return the moves sorted from most to least promising."""
+    return sorted(moves, key=lambda move: score_move(board, move, ttMove, ply), reverse=True)
+
+def is_legal(board: bitboard.Board, move: chess.Move):
+    """Whether a move from another position (hash move, killer) is legal on the board.
+    Only the moves of the piece on its from square are generated."""
+    return move in board.generate_legal_moves(chess.BB_SQUARES[move.from_square], chess.BB_ALL)
+
+def pick_moves(board: bitboard.Board, ttMove: chess.Move = None, ply: int = 0, captures_only: bool = False):
+    """Yield the legal moves in the order of order_moves(), generating them in stages:
+    the hash move, captures, promotions, killers, then quiet moves.
+    With captures_only, only the captures (including en passant and capture promotions) are yielded."""
+    us = board.turn
+    if ttMove and is_legal(board, ttMove):
+        yield ttMove
+    else:
+        ttMove = None
+
+    captures = board.generate_legal_captures()
+    for move in sorted(captures, key=lambda move: mvv_lva(board, move), reverse=True):
+        if move != ttMove:
+            yield move
+    if captures_only:
+        return
+
+    # pawns on the 7th rank only have promotions, which are generated together
+    promoting = board.pawns & board.occupied_co[us] & (chess.BB_RANK_7 if us == chess.WHITE else chess.BB_RANK_2)
+    empty = ~board.occupied & chess.BB_ALL
+    if promoting:
+        promotions = board.generate_legal_moves(promoting, empty)
+        for move in sorted(promotions, key=lambda move: move.promotion, reverse=True):
+            if move != ttMove:
+                yield move
+
+    killerMoves = []
+    for killer in killers[ply]:
+        if killer and killer != ttMove and not board.is_capture(killer) and not killer.promotion \
+                and is_legal(board, killer):
+            killerMoves.append(killer)
+            yield killer
+
+    # castling moves are generated when the rook's square is in the target mask
+    quiets = board.generate_legal_moves(~promoting & chess.BB_ALL, empty | board.castling_rights & board.occupied_co[us])
+    table = history[us]
+    ep = board.ep_square
+    for move in sorted(quiets, key=lambda move: table[move.from_square * 64 + move.to_square], reverse=True):
+        if move != ttMove and move not in killerMoves and (move.to_square != ep or not board.is_en_passant(move)):
+            yield move
+
+def update(board: bitboard.Board, move: chess.Move, depth: int, ply: int):
+    """Called when a move causes a beta cutoff, to update the killers and history."""
+    if board.is_capture(move) or move.promotion:
+        return  # captures are already ordered well by MVV-LVA
+
+    if killers[ply][0] != move:
+        killers[ply][1] = killers[ply][0]
+        killers[ply][0] = move
+
+    table = history[board.turn]
+    index = move.from_square * 64 + move.to_square
+    table[index] += depth * depth
+    if table[index] > HISTORY_MAX:
+        for i in range(4096):
+            table[i] >>= 1
@@ -0,0 +1,92 @@
+# Strategos chess engine, written in Python.
+
+# pawns.py contains the pawn structure evaluation.
+# Everything works on the integer pawn bitboards (board.pawns & board.occupied_co[color]),
+# using file fills and shifts instead of looping over pairs of pawns.
+
+import bitboard
+from engine_types import *
+
+BB_NOT_FILE_A = chess.BB_ALL & ~chess.BB_FILE_A
+BB_NOT_FILE_H = chess.BB_ALL & ~chess.BB_FILE_H
+
+def north_fill(bb: chess.Bitboard):
+    """Smear every bit of the bitboard up the board (towards rank 8)."""
+    bb |= (bb << 8) & chess.BB_ALL
+    bb |= (bb << 16) & chess.BB_ALL
+    bb |= (bb << 32) & chess.BB_ALL
+    return bb
+
+def south_fill(bb: chess.Bitboard):
+    """Smear every bit of the bitboard down the board (towards rank 1)."""
+    bb |= bb >> 8
+    bb |= bb >> 16
+    bb |= bb >> 32
+    return bb
+
+def file_fill(bb: chess.Bitboard):
+    return north_fill(bb) | south_fill(bb)
+
+def adjacent(bb: chess.Bitboard):
+    """Shift the bitboard one file to each side."""
+    return ((bb & BB_NOT_FILE_H) << 1) | ((bb & BB_NOT_FILE_A) >> 1)
+
+def pawn_attacks(pawns: chess.Bitboard, color: chess.Color):
+    """All squares attacked by the given pawns."""
+    if color == chess.WHITE:
+        return (((pawns & BB_NOT_FILE_A) << 7) | ((pawns & BB_NOT_FILE_H) << 9)) & chess.BB_ALL
+    return ((pawns & BB_NOT_FILE_A) >> 9) | ((pawns & BB_NOT_FILE_H) >> 7)
+
+def pawns_of(board: bitboard.Board, color: chess.Color):
+    return board.pawns & board.occupied_co[color]
+
+def passed_pawns(board: bitboard.Board, color: chess.Color):
+    """Bitboard of the passed pawns of `color`.
+    A pawn on the 7th rank is always passed. Otherwise, it is passed unless an enemy pawn
+    on its own or an adjacent file stands on its rank or behind it (as in pieces.pawn_passed)."""
+    us = pawns_of(board, color)
+    them = pawns_of(board, not color)
+
+    if color == chess.WHITE:
+        span = north_fill(them)
+        seventh = chess.BB_RANK_7
+    else:
+        span = south_fill(them)
+        seventh = chess.BB_RANK_2
+
+    return (us & ~(span | adjacent(span))) | (us & seventh)
+
+def doubled_pawns(board: bitboard.Board, color: chess.Color):
+    """Bitboard of the pawns of `color` that share their file with another pawn."""
+    us = pawns_of(board, color)
+    return us & (north_fill((us << 8) & chess.BB_ALL) | south_fill(us >> 8))
+
+def doubled_count(board: bitboard.Board, color: chess.Color):
+    """Number of (pawn, other pawn on the same file) pairs,
+    so each pair of doubled pawns is counted twice, like Position.doubled_pawns."""
+    us = pawns_of(board, color)
+    count = 0
+    for file in chess.BB_FILES:
+        n = chess.popcount(us & file)
+        count += n * (n - 1)
+    return count
+
+def isolated_pawns(board: bitboard.Board, color: chess.Color):
+    """Bitboard of the pawns of `color` with no other pawn on their own or an adjacent file."""
+    us = pawns_of(board, color)
+    return us & ~adjacent(file_fill(us)) & ~doubled_pawns(board, color)
+
+def backward_pawns(board: bitboard.Board, color: chess.Color):
+    """Bitboard of the backward pawns of `color`: pawns that no pawn on an adjacent file
+    can support any more, and whose stop square is attacked by an enemy pawn."""
+    us = pawns_of(board, color)
+    enemyAttacks = pawn_attacks(pawns_of(board, not color), not color)
+
+    if color == chess.WHITE:
+        supported = north_fill(adjacent(us))
+        stopAttacked = enemyAttacks >> 8
+    else:
+        supported = south_fill(adjacent(us))
+        stopAttacked = (enemyAttacks << 8) & chess.BB_ALL
+
+    return us & ~supported & stopAttacked
@@ -0,0 +1,86 @@
+# Strategos chess engine, written in Python.
+
+# perft.py contains the perft (performance test) of the move generation.
+# perft counts the leaf nodes of the legal move tree up to a depth, using the same
+# make/unmake (Position.push / Position.pop) as the search, so that the counts can be
+# compared to known values to catch move generation bugs, and the speed measured on its own.
+#   perft <depth>            count the nodes from the current position
+#   divide <depth>           the same, with the count below every root move
+#   perftsuite [max depth]   check the standard perft positions
+
+import time
+
+import position
+from engine_types import *
+
+# Standard perft positions, with their node counts at depth 1, 2, 3, ...
+# https://www.chessprogramming.org/Perft_Results
+SUITE = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", [20, 400, 8902, 197281, 4865609]),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890, 3894594]),
+]
+
+def perft(pos: position.Position, depth: int, bulk: bool = True):
+    """Return the number of leaf nodes at the given depth.
+    With bulk counting, the moves at the last ply are counted instead of being made."""
+    if depth == 0:
+        return 1
+    moves = list(pos.board.legal_moves)
+    if bulk and depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        pos.push(move)
+        nodes += perft(pos, depth - 1, bulk)
+        pos.pop()
+    return nodes
+
+def divide(pos: position.Position, depth: int, bulk: bool = True):
+    """Return the perft count below each root move, as a list of (move, nodes)."""
+    results = []
+    for move in pos.board.legal_moves:
+        pos.push(move)
+        results.append((move, perft(pos, depth - 1, bulk)))
+        pos.pop()
+    return results
+
+def run(pos: position.Position, depth: int, divided: bool = False):
+    """Handle the `perft` and `divide` commands."""
+    start = time.time()
+    if divided:
+        nodes = 0
+        for move, n in divide(pos, depth):
+            print(f"{move.uci()}: {n}")
+            nodes += n
+        print()
+    else:
+        nodes = perft(pos, depth)
+    t = time.time() - start
+
+    print(f"Nodes searched: {nodes}")
+    print(f"Time taken: {round(t, 3)}s")
+    print(f"Nodes per second: {round(nodes / t) if t else 0}")
+
+def suite(max_depth: int = 3):
+    """Check the perft counts of the standard positions up to max_depth."""
+    nodes = failed = 0
+    start = time.time()
+    for fen, counts in SUITE:
+        pos = position.Position(fen)
+        for depth, expected in enumerate(counts[:max_depth], start=1):
+            n = perft(pos, depth)
+            nodes += n
+            if n != expected:
+                failed += 1
+            print(f"{'ok    ' if n == expected else 'FAILED'} depth {depth} nodes {n} expected {expected} fen {fen}")
+    t = time.time() - start
+
+    print(f"\n{'All passed' if not failed else f'{failed} failed'}")
+    print(f"Nodes searched: {nodes}")
+    print(f"Time taken: {round(t, 3)}s")
+    print(f"Nodes per second: {round(nodes / t) if t else 0}")
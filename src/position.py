@@ -1,6 +1,7 @@
 # Strategos chess engine, written in Python.
 
 import bitboard
+import pawns
 from engine_types import *
 
 class Position:
@@ -18,32 +19,111 @@ class Position:
     # side to move
     side_to_move = True  # True = white, False = black
     
+    # running material and PSQT sums, indexed by color and updated on push/pop
+    material_mg = None; material_eg = None
+    psqt_mg = None; psqt_eg = None
+    
     def __init__(self, fen=None):
         self.board = bitboard.Board(fen)
         # obtain information from the FEN string
-        chess_board = self.board.chess_board()
+        board = self.board
+        
+        self.en_passant = board.ep_square
+        self.castling = [board.has_kingside_castling_rights(chess.WHITE),
+                            board.has_queenside_castling_rights(chess.WHITE),
+                            board.has_kingside_castling_rights(chess.BLACK),
+                            board.has_queenside_castling_rights(chess.BLACK)]
         
-        self.en_passant = chess_board.ep_square
-        self.castling = [chess_board.has_kingside_castling_rights(chess.WHITE),
-                            chess_board.has_queenside_castling_rights(chess.WHITE),
-                            chess_board.has_kingside_castling_rights(chess.BLACK),
-                            chess_board.has_queenside_castling_rights(chess.BLACK)]
+        self.game_ply = board.ply()
+        self.side_to_move = board.turn
+        
+        self.init_accumulators()
+    
+    def init_accumulators(self):
+        """Compute the material and PSQT sums from scratch."""
+        import eval_psqt  # imported here, as eval_psqt itself imports position
+        self.PSQ = eval_psqt.PSQ
         
-        self.game_ply = chess_board.ply()
-        self.side_to_move = chess_board.turn
+        self.material_mg = [0, 0]; self.material_eg = [0, 0]
+        self.psqt_mg = [0, 0]; self.psqt_eg = [0, 0]
+        for color in [chess.WHITE, chess.BLACK]:
+            self.material_mg[color] = self.board.material(color, MIDDLEGAME)
+            self.material_eg[color] = self.board.material(color, ENDGAME)
+            self.psqt_mg[color] = eval_psqt.eval_psqt(self, color, MIDDLEGAME)
+            self.psqt_eg[color] = eval_psqt.eval_psqt(self, color, ENDGAME)
+        
+        self.stack = []
+    
+    def add_piece(self, color: chess.Color, pieceType: chess.PieceType, square: chess.Square):
+        self.material_mg[color] += material_(pieceType, MIDDLEGAME)
+        self.material_eg[color] += material_(pieceType, ENDGAME)
+        mg, eg = self.PSQ[color][pieceType][square]
+        self.psqt_mg[color] += mg
+        self.psqt_eg[color] += eg
+    
+    def remove_piece(self, color: chess.Color, pieceType: chess.PieceType, square: chess.Square):
+        self.material_mg[color] -= material_(pieceType, MIDDLEGAME)
+        self.material_eg[color] -= material_(pieceType, ENDGAME)
+        mg, eg = self.PSQ[color][pieceType][square]
+        self.psqt_mg[color] -= mg
+        self.psqt_eg[color] -= eg
+    
+    def push(self, move: chess.Move):
+        """Make a move on the board, updating the material and PSQT sums."""
+        board = self.board
+        self.stack.append((self.material_mg[:], self.material_eg[:], self.psqt_mg[:], self.psqt_eg[:]))
+        
+        if move:  # null moves don't change the sums
+            us = board.turn
+            pieceType = board.piece_type_at(move.from_square)
+            
+            if board.is_castling(move):
+                kingside = board.is_kingside_castling(move)
+                rank = chess.square_rank(move.from_square) * 8
+                self.remove_piece(us, chess.KING, move.from_square)
+                self.add_piece(us, chess.KING, rank + (6 if kingside else 2))
+                self.remove_piece(us, chess.ROOK, rank + (7 if kingside else 0))
+                self.add_piece(us, chess.ROOK, rank + (5 if kingside else 3))
+            else:
+                if board.is_en_passant(move):
+                    self.remove_piece(not us, chess.PAWN, move.to_square + (-8 if us == chess.WHITE else 8))
+                else:
+                    captured = board.piece_type_at(move.to_square)
+                    if captured:
+                        self.remove_piece(not us, captured, move.to_square)
+                
+                self.remove_piece(us, pieceType, move.from_square)
+                self.add_piece(us, move.promotion or pieceType, move.to_square)
+        
+        board.push(move)
+        self.side_to_move = board.turn
+    
+    def pop(self):
+        """Unmake the last move, restoring the sums saved by push()."""
+        board = self.board
+        board.pop()
+        self.material_mg, self.material_eg, self.psqt_mg, self.psqt_eg = self.stack.pop()
+        self.side_to_move = board.turn
         
     def fen(self):
         return self.board.fen()
 
+    def key(self):
+        """Zobrist hash of the position, used to index the transposition table."""
+        return self.board.zobrist()
+    
     def legal_moves(self):
-        return self.board.chess_board().legal_moves
+        return self.board.legal_moves
     
     def material(self, side_to_move: chess.Color, phase=MIDDLEGAME):
-        return self.board.material(side_to_move=side_to_move, phase=phase)
+        return self.material_mg[side_to_move] if phase == MIDDLEGAME else self.material_eg[side_to_move]
+    
+    def psqt(self, side_to_move: chess.Color, phase=MIDDLEGAME):
+        return self.psqt_mg[side_to_move] if phase == MIDDLEGAME else self.psqt_eg[side_to_move]
     
     def game_phase(self):
         """currently uses a primitive material count to determine the game phase"""
-        m = self.material(chess.WHITE) + self.material(chess.BLACK)
+        m = self.material_mg[chess.WHITE] + self.material_mg[chess.BLACK]
         if m < QUEEN_VALUE_EG * 2:
             return ENDGAME
         else:
@@ -59,7 +139,7 @@ class Position:
         
         for color in [chess.WHITE, chess.BLACK]:
             for piece_type in PIECE_TYPES:
-                for piece in self.board.chess_board().pieces(piece_type=piece_type, color=color):
+                for piece in self.board.pieces(piece_type=piece_type, color=color):
                     pieces.append(piece)
         
         return pieces
@@ -69,34 +149,19 @@ class Position:
         return len(self.all_pieces())
     
     def move_is_stm(self, move: chess.Move):
-        # assumes that the move is in pos.board.chess_board().legal_moves
+        # assumes that the move is in pos.board.legal_moves
         # checks if the moved piece has same color as side to move
-        return self.board.chess_board().piece_at(move.from_square).color == self.side_to_move
+        return self.board.piece_at(move.from_square).color == self.side_to_move
     
     def doubled_pawns(self, side_to_move: chess.Color):
         """Returns a list of doubled pawns on the board for side to move."""
         doubled_pawns = []
-        for pawn in self.board.chess_board().pieces(chess.PAWN, side_to_move):
-            for other_pawn in self.board.chess_board().pieces(chess.PAWN, side_to_move):
-                if pawn != other_pawn and chess.square_file(pawn) == chess.square_file(other_pawn):
-                    doubled_pawns.append(pawn)
+        us = pawns.pawns_of(self.board, side_to_move)
+        for pawn in chess.scan_forward(pawns.doubled_pawns(self.board, side_to_move)):
+            doubled_pawns += [pawn] * (chess.popcount(us & chess.BB_FILES[chess.square_file(pawn)]) - 1)
         
         return doubled_pawns  # Note that each pair of doubled pawns will have 2 entries.
     
     def isolated_pawns(self, side_to_move: chess.Color):
         """Returns a list of isolated pawns on the board for side to move."""
-        isolated_pawns = []
-        for pawn in self.board.chess_board().pieces(chess.PAWN, side_to_move):
-            isolated = True
-            for other_pawn in self.board.chess_board().pieces(chess.PAWN, side_to_move):
-                if pawn != other_pawn and chess.square_file(pawn) == chess.square_file(other_pawn) - 1:
-                    isolated = False
-                elif pawn != other_pawn and chess.square_file(pawn) == chess.square_file(other_pawn) + 1:
-                    isolated = False
-                elif pawn != other_pawn and chess.square_file(pawn) == chess.square_file(other_pawn):
-                    isolated = False
-                    
-            if isolated:
-                isolated_pawns.append(pawn)
-        
-        return isolated_pawns
\ No newline at end of file
+        return list(chess.scan_forward(pawns.isolated_pawns(self.board, side_to_move)))
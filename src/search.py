@@ -1,172 +1,477 @@
 # Strategos chess engine, written in Python.
 # search.py contains the search function for the engine.
 
+import math
+
 import evaluate
 import position
 import uci
 from engine_types import *
 import stop_search
 import eval_psqt
+import tt
+import evalcache
+import movepick
+import smp
+import timeman
+import endgame
+import analysiscache
+import book
+import stats
+import evalbatch
 
 nodes = 0
 
-killers = []
+# node count at which the search stops (`go nodes`), or None
+max_nodes = None
 
-best_score = -VALUE_INF
+# if not None, only these moves are searched at the root (tablebase filtering)
+root_moves = None
+
+# Delta pruning margin: in quiescence search, captures that can't bring the score
+# within this margin of alpha are skipped.
+DELTA_MARGIN = 200
+
+# Aspiration windows: from this depth on, an iteration first searches a window of
+# ASPIRATION_WINDOW around the score of the previous one, and widens it if the score falls outside.
+ASPIRATION_DEPTH = 4
+ASPIRATION_WINDOW = 50
+
+# best root move and its score so far in the current search
 best_move = None
-max_score = -VALUE_INF; min_score = VALUE_INF
+best_score = -VALUE_INF
 
-def prune(pos: position.Position, move: chess.Move, alpha: int, beta: int, side_to_move: chess.Color, depth: int):
-    """Prune the search tree."""
-    global killers
-    
-    if abs(evaluate.evaluate(pos, side_to_move)) > 750:
-        return False
-    
-    # if pos.board.chess_board().is_capture(move):
-    #     if evaluate.see_eval(pos, side_to_move, move) < -50:
-    #         return True
-    
-    pos.board.chess_board().push(move)
-    e = evaluate.evaluate(pos, side_to_move)
-    pos.board.chess_board().pop()
-    if e < alpha - 200 and abs(e) < 500:
-        killers.append(move)
-        return True
+# Triangular PV table: pv[ply] is the principal variation from the node at that ply.
+pv = [[] for _ in range(MAX_PLY + 1)]
+
+# Switches for verify.py: without the transposition table, the selective search and quiescence
+# search, the search must return the same scores as plain minimax.
+use_tt = True
+use_qsearch = True
+
+# The selective search, each technique switchable with a UCI option (see config.py):
+#   reverse futility pruning: at low depth, a node whose static eval is above beta by a margin
+#       per ply of depth fails high without a search;
+#   null-move pruning: if passing the move and searching with a reduced depth still fails high,
+#       so does the node. Not in check, and not without pieces, where zugzwang is common;
+#   futility pruning: at low depth, quiet moves are skipped if the static eval plus a margin
+#       per ply of depth can't reach alpha;
+#   late move reductions: quiet moves late in the move ordering are searched with a reduced depth
+#       (REDUCTIONS[depth][move number]), and re-searched to full depth if they beat alpha;
+#   check extensions: moves that give check are searched one ply deeper.
+SELECTIVITY = ["REVERSE_FUTILITY", "NULL_MOVE", "FUTILITY", "LMR", "CHECK_EXTENSION"]
+
+REDUCTIONS = []
+
+def init_reductions():
+    """Build the late move reduction table from config.LMR_BASE and config.LMR_DIVISOR (in hundredths)."""
+    global REDUCTIONS
+    REDUCTIONS = [[0] * 64 for _ in range(64)]
+    for depth in range(1, 64):
+        for moveNumber in range(1, 64):
+            REDUCTIONS[depth][moveNumber] = int(config.LMR_BASE / 100 + math.log(depth) * math.log(moveNumber)
+                                                / (config.LMR_DIVISOR / 100))
+
+init_reductions()
+
+def mate_in(ply: int):
+    """Score of delivering mate at the given ply: a shorter mate scores higher."""
+    return VALUE_MATE + MAX_PLY - ply
+
+def mated_in(ply: int):
+    return -mate_in(ply)
+
+def score_to_tt(score, ply: int):
+    """Mate scores are stored in the transposition table relative to the position, not the root."""
+    if score >= VALUE_MATE:
+        return score + ply
+    if score <= -VALUE_MATE:
+        return score - ply
+    return score
+
+def score_from_tt(score, ply: int):
+    if score >= VALUE_MATE:
+        return score - ply
+    if score <= -VALUE_MATE:
+        return score + ply
+    return score
+
+def score_to_uci(score):
+    """The `score` part of an info line: `cp <centipawns>` or `mate <moves>`."""
+    if score >= VALUE_MATE:
+        return f"mate {(VALUE_MATE + MAX_PLY - score + 1) // 2}"
+    if score <= -VALUE_MATE:
+        return f"mate -{(score + VALUE_MATE + MAX_PLY) // 2}"
+    return f"cp {round(score)}"
+
+def is_draw(board):
+    """Insufficient material, and the automatic draws (75-move rule and fivefold repetition)."""
+    return board.is_insufficient_material() or board.halfmove_clock >= 150 or board.is_repetition(5)
+
+def qsearch(pos: position.Position, alpha, beta, ply: int):
+    """Quiescence search: search only captures until the position is quiet,
+    and return its score from side to move's POV."""
+    global nodes
+    nodes += 1
+    if stats.enabled:
+        stats.count("qnodes")
+    board = pos.board
+    side_to_move = board.turn
     
-    if depth <= 3 and move in killers:
-        return True
+    if ply >= MAX_PLY:
+        return evaluate.evaluate(pos, side_to_move)
     
+    if board.is_check():
+        # no standing pat in check: all evasions have to be searched (if there is none, it's mate)
+        standPat = mated_in(ply)
+        moves = movepick.pick_moves(board, None, ply)
+    else:
+        # the side to move can usually do at least as well as the static eval ("stand pat")
+        standPat = evaluate.evaluate(pos, side_to_move)
+        if standPat >= beta:
+            return standPat
+        moves = movepick.pick_moves(board, None, ply, captures_only=True)
     
-def search(pos: position.Position, depth: int, alpha: int, beta: int, side_to_move: chess.Color, root: bool = False):
-    global nodes, best_score, best_move, max_score, min_score
-    bestMove = None
-    """Search the position to a given depth."""
+    bestScore = standPat
+    alpha = max(alpha, standPat)
     
-    if depth == 0 or pos.board.chess_board().is_game_over():
-        nodes += 1
-        return evaluate.evaluate(pos, side_to_move), best_move
-
-    if side_to_move == chess.WHITE:
-        max_score = -VALUE_INF
-        for move in list(pos.board.chess_board().legal_moves):
-            if bestMove is None: bestMove = move
-            # do we need to stop searching?
-            # (either a `stop` command was received, or we've reached the allocated time)
-            if stop_search.search_has_stopped():
-                return best_score, best_move
-            
-            # search for checkmate and stalemate first
-            if pos.board.chess_board().is_checkmate():
-                max_score = best_score = VALUE_MATE + depth
-                best_move = move
-                return VALUE_MATE + depth, move
-            elif pos.board.chess_board().is_stalemate() and max_score < VALUE_DRAW:
-                max_score = best_score = VALUE_DRAW
-                best_move = move
-                return VALUE_DRAW, move
-            
-            # TODO: implement proper pruning
-            if prune(pos, move, alpha, beta, side_to_move, depth):
+    for move in moves:
+        if stop_search.search_has_stopped():
+            break
+        
+        if board.is_capture(move) and not move.promotion and not board.is_check():
+            # Delta pruning: even winning the captured piece can't raise alpha.
+            captured = chess.PAWN if board.is_en_passant(move) else board.piece_type_at(move.to_square)
+            if standPat + material_(captured, pos.game_phase()) + DELTA_MARGIN < alpha:
                 continue
             
-            pos.board.chess_board().push(move)
-            nodes += 1
-            score, _ = search(pos, depth - 1, alpha, beta, chess.BLACK)
-            score = -score
-            pos.board.chess_board().pop()
+            # SEE pruning: skip captures that lose material.
+            if evaluate.see_eval(pos, side_to_move, move) < 0:
+                continue
         
-            if score > max_score:
-                max_score = score
-                if max_score > best_score:
-                    bestMove = move
-                
-            if root and score > best_score:
-                best_move = bestMove
+        pos.push(move)
+        score = -qsearch(pos, -beta, -alpha, ply + 1)
+        pos.pop()
         
-            beta = (alpha + beta) // 2
-            alpha = max(alpha, max_score)
-            
-            if beta <= alpha:
-                break
+        if score > bestScore:
+            bestScore = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    
+    return bestScore
+
+def search(pos: position.Position, depth: int, alpha, beta, ply: int = 0):
+    """Negamax alpha-beta search with principal variation search, to a given depth.
+    Return the score from side to move's POV: exact inside the (alpha, beta) window,
+    and a bound on the score outside of it (fail-soft). At the root (ply 0), the best move
+    is kept in `best_move`; the principal variation from each node is kept in `pv`."""
+    global nodes, best_move, best_score
+    
+    # one budget for all the processes, as in the node count that is reported
+    if max_nodes is not None and nodes + smp.helper_nodes() >= max_nodes:
+        stop_search.stop_search()
+    
+    pv[ply] = []
+    board = pos.board
+    if depth <= 0 or ply >= MAX_DEPTH:
+        # resolve the captures first, so that we don't evaluate in the middle of an exchange
+        if use_qsearch:
+            return qsearch(pos, alpha, beta, ply)
+        nodes += 1
+        return evaluate.evaluate(pos, board.turn)
     
-        return max_score, bestMove
+    nodes += 1
+    root = ply == 0
+    pvNode = beta - alpha > 1
     
-    else: # side_to_move == chess.BLACK
-        min_score = float('inf')
-        for move in list(pos.board.chess_board().legal_moves):
-            if bestMove is None: bestMove = move
-            # do we need to stop searching?
-            # (either a `stop` command was received, or we've reached the allocated time)
+    if not root:
+        if is_draw(board):
+            return VALUE_DRAW
+        
+        # Probe the endgame tablebases.
+        tbScore = endgame.probe_score(pos, ply)
+        if tbScore is not None:
+            return tbScore
+
+    # Probe the transposition table. Only non-PV nodes return its score, so that the PV is complete.
+    key = pos.key()
+    ttMove = None
+    if use_tt:
+        entry = tt.table.probe(key)
+        if stats.enabled:
+            stats.count("ttprobes")
+            stats.count("tthits", entry is not None)
+        if entry is not None:
+            ttMove = entry[tt.MOVE]
+            ttScore = score_from_tt(entry[tt.SCORE], ply)
+            if not pvNode and entry[tt.DEPTH] >= depth and (entry[tt.BOUND] == tt.BOUND_EXACT
+                    or (entry[tt.BOUND] == tt.BOUND_LOWER and ttScore >= beta)
+                    or (entry[tt.BOUND] == tt.BOUND_UPPER and ttScore <= alpha)):
+                if stats.enabled:
+                    stats.count("ttcutoffs")
+                return ttScore
+
+    inCheck = board.is_check()
+    # static eval, for the selective search at non-PV nodes
+    staticEval = None
+    if not pvNode and not inCheck and abs(beta) < VALUE_TB_WIN:
+        staticEval = evaluate.evaluate(pos, board.turn)
+        
+        # Reverse futility pruning
+        if config.REVERSE_FUTILITY and depth <= config.REVERSE_FUTILITY_DEPTH \
+                and staticEval - config.REVERSE_FUTILITY_MARGIN * depth >= beta:
+            if stats.enabled:
+                stats.count("rfp")
+            return staticEval
+        
+        # Null-move pruning, not twice in a row
+        if config.NULL_MOVE and depth >= 2 and staticEval >= beta and board.stack and board.stack[-1][0] \
+                and board.occupied_co[board.turn] & ~(board.pawns | board.kings):
+            reduction = config.NULL_MOVE_REDUCTION + depth // 6
+            pos.push(chess.Move.null())
+            score = -search(pos, depth - 1 - reduction, -beta, -beta + 1, ply + 1)
+            pos.pop()
             if stop_search.search_has_stopped():
-                return min_score, best_move
-            
-            # search for checkmate and stalemate
-            if pos.board.chess_board().is_checkmate():
-                min_score = best_score = -(VALUE_MATE + depth)
-                best_move = move
-                return -(VALUE_MATE + depth), move
-            elif pos.board.chess_board().is_stalemate() and min_score > VALUE_DRAW:
-                min_score = best_score = VALUE_DRAW
-                best_move = move
-                return VALUE_DRAW, move
-            
-            if prune(pos, move, alpha, beta, side_to_move, depth):
-                continue
-                
-            pos.board.chess_board().push(move)
-            nodes += 1
-            score, _ = search(pos, depth - 1, alpha, beta, chess.WHITE)
-            score = -score
-            pos.board.chess_board().pop()
+                return 0
+            if score >= beta:
+                if stats.enabled:
+                    stats.count("nullcutoffs")
+                # a mate found after passing is not a proven mate
+                return beta if score >= VALUE_TB_WIN else score
+
+    # Generate the moves in stages: hash move, captures, killers, then quiet moves.
+    moves = movepick.pick_moves(board, ttMove, ply)
+    if root and root_moves:
+        moves = [move for move in moves if move in root_moves]
+
+    # Evaluate the children in one batch, before qsearch() asks for them one at a time.
+    # qsearch() only evaluates a child from its side to move's POV.
+    if depth == 1 and config.BATCH_EVAL:
+        moves = list(moves)
+        evalbatch.prefill(pos, moves, (not board.turn,))
+    
+    originalAlpha = alpha
+    bestScore = -VALUE_INF
+    bestMove = None
+    futilityValue = None
+    if staticEval is not None and config.FUTILITY and depth <= config.FUTILITY_DEPTH:
+        futilityValue = staticEval + config.FUTILITY_MARGIN * depth
+    i = -1
+    for i, move in enumerate(moves):
+        quiet = not board.is_capture(move) and not move.promotion
+        pos.push(move)
+        givesCheck = board.is_check()
+        newDepth = depth - 1
+        if givesCheck and config.CHECK_EXTENSION:
+            newDepth += 1
         
-            if score < min_score:
-                min_score = score
-                if min_score < best_score or best_score == -VALUE_INF:
-                    bestMove = move
-                
-            if root and min_score < best_score:
-                best_move = bestMove
+        # Futility pruning: the first move is always searched, so that there is a best move
+        if futilityValue is not None and futilityValue <= alpha and quiet and not givesCheck and bestMove is not None:
+            pos.pop()
+            bestScore = max(bestScore, futilityValue)
+            if stats.enabled:
+                stats.count("futility")
+            continue
         
-            beta = (alpha + beta) // 2
-            alpha = min(alpha, min_score)
+        if i == 0:
+            score = -search(pos, newDepth, -beta, -alpha, ply + 1)
+        else:
+            # Late move reductions
+            reduction = 0
+            if config.LMR and depth >= 3 and i >= 3 and quiet and not givesCheck and not inCheck:
+                reduction = REDUCTIONS[min(depth, 63)][min(i, 63)] - (1 if pvNode else 0)
+                reduction = max(0, min(reduction, newDepth - 1))
             
-            if beta <= alpha:
-                break
+            # Principal variation search: the first move is expected to be the best,
+            # so the others are only searched with a null window, to prove that they are worse.
+            # The few that are not get a full re-search.
+            score = -search(pos, newDepth - reduction, -alpha - 1, -alpha, ply + 1)
+            if reduction and score > alpha:
+                if stats.enabled:
+                    stats.count("lmrresearches")
+                score = -search(pos, newDepth, -alpha - 1, -alpha, ply + 1)
+            if pvNode and alpha < score < beta:
+                score = -search(pos, newDepth, -beta, -alpha, ply + 1)
+        pos.pop()
+        
+        # do we need to stop searching?
+        # (either a `stop` command was received, or we've reached the allocated time)
+        # The score of an interrupted search is not used.
+        if stop_search.search_has_stopped():
+            return bestScore
+        
+        if score > bestScore:
+            bestScore = score
+            bestMove = move
+            if score > alpha:
+                alpha = score
+                pv[ply] = [move] + pv[ply + 1]
+                if root:
+                    best_move = move; best_score = score
+                if alpha >= beta:
+                    movepick.update(board, move, depth, ply)
+                    if stats.enabled:
+                        stats.count("cutoffs")
+                        stats.count("firstmove", i == 0)
+                    break
+    
+    # no legal move: checkmate or stalemate
+    if i < 0:
+        return mated_in(ply) if inCheck else VALUE_DRAW
     
-        return min_score, bestMove
+    if use_tt:
+        if bestScore >= beta:
+            bound = tt.BOUND_LOWER
+        elif bestScore > originalAlpha:
+            bound = tt.BOUND_EXACT
+        else:
+            bound = tt.BOUND_UPPER
+        tt.table.store(key, depth, bound, score_to_tt(bestScore, ply), bestMove)
+    return bestScore
+
+def aspiration_search(pos: position.Position, depth: int, previousScore):
+    """Search the root with a narrow window around the previous iteration's score,
+    widening it on the side where the score falls outside, until the score is inside."""
+    if depth < ASPIRATION_DEPTH or abs(previousScore) >= VALUE_TB_WIN:
+        return search(pos, depth, -VALUE_INF, VALUE_INF)
     
-def iterative_deepening(pos: position.Position, max_depth: int, side_to_move: chess.Color, move_time: int=None):
-    import time
-    starttime = time.time()
-    if move_time is not None:
-        stop_search.set_time_limit(move_time / 1000)
+    delta = ASPIRATION_WINDOW
+    alpha = previousScore - delta; beta = previousScore + delta
+    while True:
+        score = search(pos, depth, alpha, beta)
+        if stop_search.search_has_stopped():
+            return score
+        if score <= alpha:
+            alpha = max(score - delta, -VALUE_INF)
+        elif score >= beta:
+            beta = min(score + delta, VALUE_INF)
+        else:
+            return score
+        delta *= 2
+        if delta > 4 * ASPIRATION_WINDOW * ASPIRATION_WINDOW:
+            alpha, beta = -VALUE_INF, VALUE_INF
     
-    global best_move
+def iterative_deepening(pos: position.Position, max_depth: int, side_to_move: chess.Color, move_time: int=None,
+                        limits: timeman.Limits = None, time_manager: timeman.TimeManager = None):
+    """Search the position with increasing depth until a limit is reached. Prints the UCI output,
+    and returns the best move as a UCI string. The UCI thread creates the time manager before
+    starting the search, so that a `ponderhit` can't arrive before it exists."""
+    if limits is None:
+        limits = timeman.Limits()
+        limits.movetime = move_time
+    
+    if limits.depth is not None:
+        max_depth = min(max_depth, limits.depth)
+    if limits.mate is not None:
+        # a mate in N moves is found within 2N - 1 plies
+        max_depth = min(max_depth, 2 * limits.mate - 1)
+    
+    global nodes, best_move, best_score, max_nodes, root_moves
+    nodes = 0  # nodes of this search, so that nps is measured over the same span as the time
+    max_nodes = limits.nodes
+    timeManager = time_manager or timeman.TimeManager(limits, side_to_move)
+    previousNodes = 0  # nodes of the previous iteration
+    
+    best_move = None; best_score = -VALUE_INF
+    bestMove = None  # best move of the last iteration, as a UCI string
+    tt.table.new_search()
+    movepick.new_search()
+    evalcache.cache.reset_stats()
+    endgame.new_search()
+    stats.clear()
+    root_moves = endgame.filter_root_moves(pos)
+    
+    # Play from the opening book, if the position is in it and the search is not limited otherwise.
+    if not limits.infinite and not limits.ponder and limits.depth is None and limits.nodes is None \
+            and limits.mate is None:
+        bookMove = book.probe(pos)
+        if bookMove is not None:
+            print(f"info string book move {uci.move_to_uci(bookMove)}")
+            stop_search.cancel_time_limit()
+            print(bestmove_string(pos, bookMove))
+            return uci.move_to_uci(bookMove)
+
+    # Consult the persistent analysis cache: a deep enough result is reused as it is,
+    # a shallower one gives the search its best move to start with.
+    stored = analysiscache.probe(pos)
+    if stored is not None and stored[2] in (root_moves or pos.board.legal_moves):
+        storedDepth, storedScore, storedMove = stored
+        if storedDepth >= max_depth and limits.nodes is None and limits.mate is None and not limits.ponder:
+            print(f"info depth {storedDepth} score {score_to_uci(storedScore)} nodes 0 time 0 "
+                  f"pv {uci.move_to_uci(storedMove)}")
+            stop_search.cancel_time_limit()
+            max_nodes = None
+            print(bestmove_string(pos, storedMove))
+            return uci.move_to_uci(storedMove)
+        tt.table.store(pos.key(), storedDepth, tt.BOUND_EXACT, storedScore, storedMove)
+    
+    smp.start_helpers(pos, max_depth, side_to_move)
+    score = 0
     for depth in range(1, max_depth + 1):
-        score, best_move = search(pos, depth, -VALUE_INF, VALUE_INF, side_to_move, root=True)
+        iterationStartNodes = nodes
+        score = aspiration_search(pos, depth, score)
         if best_move is not None:
-            best_move = uci.move_to_uci(best_move)
+            # an interrupted iteration still counts the root moves it finished
+            bestMove = uci.move_to_uci(best_move)
+        if stop_search.search_has_stopped():
+            # search has stopped, output final bestmove
+            break
         
-        t = int((time.time() - starttime) * 1000)
-        score = round(score)
-        s = f"info depth {depth} seldepth {depth} multipv 1 score cp {score} nodes {nodes} nps {1000 * nodes // t if t else 0} hashfull 0 tbhits 0 time {t} pv {best_move}"
+        t = int(timeManager.elapsed() * 1000)
+        n = nodes + smp.helper_nodes()  # include the nodes of the helper processes
+        pvString = " ".join(uci.move_to_uci(move) for move in pv[0]) or bestMove
+        print(f"info depth {depth} seldepth {depth} multipv 1 score {score_to_uci(score)} nodes {n} "
+              f"nps {1000 * n // t if t else 0} hashfull {tt.table.hashfull()} tbhits {endgame.tbhits} "
+              f"time {t} pv {pvString}")
         
-        # special case: mate in x
-        if score > VALUE_MATE:
-            s = s.replace(f"cp {score}", f"mate {score - VALUE_MATE}")
-        elif score < -VALUE_MATE:
-            s = s.replace(f"cp {score}", f"mate -{abs(score) - VALUE_MATE}")
+        analysiscache.store(pos, depth, round(score), best_move)
         
-        print(s)  # TODO: Add proper pv output
+        if limits.mate is not None and score >= VALUE_MATE and mate_in(0) - score <= 2 * limits.mate - 1:
+            break  # `go mate`: a mate has been found
         
-        if stop_search.search_has_stopped():
-            # search has stopped, output final bestmove
-            print(f"bestmove {best_move} ponder 0000")  # we print ponder as well, even though we don't support it
+        # stop early if the next iteration is not expected to finish in time
+        iterationNodes = nodes - iterationStartNodes
+        if not timeManager.next_iteration_fits(iterationNodes, previousNodes, nodes):
             break
-            
-        # sometimes we increase a depth if the score is extremely high
-        if depth < 6 and abs(evaluate.evaluate(pos, side_to_move)) > 500:
-            depth += 1
-            
-    print(f"bestmove {best_move} ponder 0000")
\ No newline at end of file
+        previousNodes = iterationNodes
+    
+    if bestMove is None:
+        # stopped before the first root move was searched
+        moves = movepick.order_moves(pos.board, list(root_moves or pos.board.legal_moves), None, 0)
+        bestMove = uci.move_to_uci(moves[0]) if moves else None
+    
+    timeManager.wait_for_bestmove()
+    smp.stop_helpers()
+    stop_search.cancel_time_limit()
+    max_nodes = None
+    print(f"info string {evalcache.cache.stats()}")
+    if stats.enabled:
+        for line in stats.report(nodes, endgame.tbhits):
+            print(line)
+    print(bestmove_string(pos, chess.Move.from_uci(bestMove) if bestMove else None))
+    return bestMove
+
+def ponder_move(pos: position.Position, move: chess.Move):
+    """Return the expected reply to our best move: the second move of the PV,
+    which is the move stored in the transposition table for the position after it,
+    or else the book's reply."""
+    pos.push(move)
+    entry = tt.table.probe(pos.key())
+    reply = entry[tt.MOVE] if entry is not None else None
+    if reply is not None and reply not in pos.board.legal_moves:
+        reply = None
+    if reply is None:
+        reply = book.probe(pos)
+    pos.pop()
+    return reply
+
+def bestmove_string(pos: position.Position, move: chess.Move):
+    """The `bestmove` line, with the move to ponder on if there is one."""
+    if move is None:
+        return "bestmove 0000"
+    reply = ponder_move(pos, move)
+    if reply is None:
+        return f"bestmove {uci.move_to_uci(move)}"
+    return f"bestmove {uci.move_to_uci(move)} ponder {uci.move_to_uci(reply)}"
\ No newline at end of file
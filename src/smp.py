@@ -0,0 +1,103 @@
+# Strategos chess engine, written in Python.
+
+# smp.py contains the parallel search (Lazy SMP).
+# When the Threads option is above 1, helper processes search the same position
+# alongside the main search, and share their results through the transposition table
+# in shared memory. Processes are used instead of threads, so that the GIL
+# doesn't serialize the searches. Only the main search prints output.
+
+import multiprocessing
+import sys
+import threading
+import time
+
+import position
+import search
+import stop_search
+import tt
+from engine_types import *
+
+helpers = []
+stop_flag = None  # set to 1 by the main process to stop the helpers
+node_counts = None  # node count of every helper, published while they search
+
+def context():
+    """Return the fork multiprocessing context, or None if the platform doesn't support it."""
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+def set_threads(threads: int):
+    """Set the number of search processes. The transposition table moves to shared memory
+    when there is more than one, so that all processes can use it."""
+    config.THREADS = threads
+    shared = threads > 1 and context() is not None
+    if shared != isinstance(tt.table, tt.SharedTranspositionTable):
+        tt.resize(config.HASH_SIZE, shared)
+
+def watch(index: int):
+    """Runs in a thread of each helper: publishes its node count and forwards the stop signal."""
+    while not stop_search.search_has_stopped():
+        node_counts[index] = search.nodes
+        if stop_flag.value:
+            stop_search.stop_search()
+        time.sleep(0.01)
+
+def helper(pos: position.Position, max_depth: int, side_to_move: chess.Color, index: int):
+    """Search the position in a helper process, until max_depth or until stopped."""
+    search.nodes = 0
+    # `go nodes` is checked by the main search against the nodes of all processes: it stops the helpers
+    search.max_nodes = None
+    threading.Thread(target=watch, args=(index,), daemon=True).start()
+
+    # Half of the helpers start one ply deeper, so that the processes spread over
+    # different depths instead of all searching the same tree.
+    for depth in range(1 + index % 2, max_depth + 1):
+        search.search(pos, depth, -VALUE_INF, VALUE_INF)
+        if stop_search.search_has_stopped():
+            break
+
+    stop_search.stop_search()
+    node_counts[index] = search.nodes
+
+def start_helpers(pos: position.Position, max_depth: int, side_to_move: chess.Color):
+    """Start config.THREADS - 1 helper processes searching the position."""
+    global stop_flag, node_counts
+    node_counts = None
+    ctx = context()
+    if ctx is None or config.THREADS <= 1:
+        return
+
+    stop_flag = ctx.RawValue("b", 0)
+    node_counts = ctx.RawArray("Q", config.THREADS)
+
+    # flush now, otherwise each helper would print the buffered output again when it exits
+    sys.stdout.flush()
+    # A new process closes its copy of sys.stdin. If the UCI thread is reading it at the time
+    # of the fork, the copy's lock is held and never released, and the helper deadlocks:
+    # so there is no sys.stdin during the fork.
+    stdin = sys.stdin
+    sys.stdin = None
+    try:
+        for index in range(1, config.THREADS):
+            process = ctx.Process(target=helper, args=(pos, max_depth, side_to_move, index), daemon=True)
+            process.start()
+            helpers.append(process)
+    finally:
+        sys.stdin = stdin
+
+def stop_helpers():
+    """Stop the helpers and wait for them to exit."""
+    if not helpers:
+        return
+    stop_flag.value = 1
+    for process in helpers:
+        process.join()
+    helpers.clear()
+
+def helper_nodes():
+    """Total number of nodes searched by the helpers so far."""
+    if node_counts is None:
+        return 0
+    return sum(node_counts[1:])
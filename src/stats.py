@@ -0,0 +1,52 @@
+# Strategos chess engine, written in Python.
+
+# stats.py contains the search and evaluation statistics.
+# Counters and evaluation step timers are only updated when enabled (UCI option Stats):
+# every caller tests `stats.enabled` first, so that they cost a single check otherwise.
+# The statistics are printed as `info string` lines at the end of each search.
+
+import time
+from engine_types import *
+
+enabled = config.STATS
+
+counters = {}
+timers = {}  # cumulative time of each evaluation step, in seconds
+
+# Evaluation steps, in the order of evaluate.evaluate_uncached()
+EVAL_STEPS = ["tablebase", "material", "psqt", "attackinfo", "hanging", "pawns", "pins", "attacks"]
+
+def clear():
+    counters.clear()
+    timers.clear()
+
+def count(name: str, n: int = 1):
+    counters[name] = counters.get(name, 0) + n
+
+def lap(step: str, start: float):
+    """Add the time since `start` to an evaluation step, and return the current time."""
+    now = time.perf_counter()
+    timers[step] = timers.get(step, 0) + now - start
+    return now
+
+def percent(part: int, total: int):
+    return round(100 * part / total, 1) if total else 0
+
+def report(nodes: int, tbhits: int):
+    """Return the statistics of the search as `info string` lines."""
+    c = counters.get
+    lines = [
+        f"info string stats nodes {nodes} qnodes {c('qnodes', 0)} evaluate {c('evaluate', 0)} "
+        f"evals {c('evals', 0)}",
+        f"info string stats cutoffs {c('cutoffs', 0)} firstmove {c('firstmove', 0)} "
+        f"({percent(c('firstmove', 0), c('cutoffs', 0))}%) ttprobes {c('ttprobes', 0)} tthits {c('tthits', 0)} "
+        f"({percent(c('tthits', 0), c('ttprobes', 0))}%) ttcutoffs {c('ttcutoffs', 0)} "
+        f"tbprobes {c('tbprobes', 0)} tbhits {tbhits}",
+    ]
+    lines.append(f"info string stats rfp {c('rfp', 0)} nullcutoffs {c('nullcutoffs', 0)} "
+                 f"futility {c('futility', 0)} lmrresearches {c('lmrresearches', 0)}")
+    total = sum(timers.values())
+    steps = " ".join(f"{step} {round(timers.get(step, 0), 3)}s ({percent(timers.get(step, 0), total)}%)"
+                     for step in EVAL_STEPS)
+    lines.append(f"info string evaltime {steps} total {round(total, 3)}s")
+    return lines
@@ -1,15 +1,36 @@
 # Strategos chess engine, written in Python.
+
+# stop_search.py contains the signal used to stop a running search,
+# either from the `stop` command or when the allocated time runs out.
 import threading
 
-STOP_SEARCH = False
+# Every search gets a fresh event, so that a timer left over from an earlier
+# search can never stop the current one.
+stop_event = threading.Event()
+timer = None
 
 def stop_search():
-    global STOP_SEARCH
-    STOP_SEARCH = True
+    stop_event.set()
     
 def search_has_stopped():
-    return STOP_SEARCH
+    return stop_event.is_set()
+
+def cancel_time_limit():
+    global timer
+    if timer is not None:
+        timer.cancel()
+        timer = None
+
+def reset():
+    """Prepare for a new search: clear the stop signal and cancel the previous time limit."""
+    global stop_event
+    cancel_time_limit()
+    stop_event = threading.Event()
 
 def set_time_limit(time_limit: float):
     """sets a time limit for the search to stop after (in seconds)"""
-    threading.Timer(time_limit, stop_search).start()
\ No newline at end of file
+    global timer
+    cancel_time_limit()
+    timer = threading.Timer(time_limit, stop_event.set)
+    timer.daemon = True
+    timer.start()
@@ -0,0 +1,124 @@
+# Strategos chess engine, written in Python.
+
+# timeman.py contains the time management for the engine.
+# It parses the limits of a `go` command, and decides how long to think:
+# a soft limit after which no new iteration is started, and a hard limit
+# at which the search is stopped.
+# While pondering (`go ponder`), there is no limit: the clock starts on `ponderhit`.
+
+import threading
+import time
+
+import stop_search
+from engine_types import *
+
+# If movestogo is not given, assume the remaining time has to last this many more moves.
+MOVES_HORIZON = 30
+
+class Limits:
+    wtime = None; btime = None; winc = 0; binc = 0; movestogo = None
+    movetime = None; depth = None; nodes = None; mate = None
+    infinite = False
+    ponder = False  # `go ponder`: search the predicted position until `ponderhit` or `stop`
+    profile = False  # `go ... profile`: write a cProfile dump of the search (not part of UCI)
+
+def parse_go(command: str):
+    """Parse a `go` command into a Limits object. Unknown tokens are ignored."""
+    limits = Limits()
+    tokens = command.split(" ")[1:]
+    for i, token in enumerate(tokens):
+        if token == "infinite":
+            limits.infinite = True
+        elif token == "ponder":
+            limits.ponder = True
+        elif token == "profile":
+            limits.profile = True
+        elif token in ["wtime", "btime", "winc", "binc", "movestogo", "movetime", "depth", "nodes", "mate"] \
+                and i + 1 < len(tokens):
+            setattr(limits, token, int(tokens[i + 1]))
+    return limits
+
+def allocate(limits: Limits, side_to_move: chess.Color):
+    """Return the (soft, hard) time limits for this move in seconds, or (None, None) if unlimited."""
+    overhead = config.MOVE_OVERHEAD / 1000
+
+    if limits.infinite:
+        return None, None
+    if limits.movetime is not None:
+        t = max(0.01, limits.movetime / 1000 - overhead)
+        return t, t
+
+    timeLeft = limits.wtime if side_to_move == chess.WHITE else limits.btime
+    if timeLeft is None:
+        return None, None
+    timeLeft /= 1000
+    increment = (limits.winc if side_to_move == chess.WHITE else limits.binc) / 1000
+    movesToGo = min(limits.movestogo or MOVES_HORIZON, MOVES_HORIZON)
+
+    # never plan to use more than what is left, minus the communication overhead
+    available = max(0.01, timeLeft - overhead)
+    soft = min(available, timeLeft / movesToGo + increment * 0.75)
+    hard = min(available, soft * 4, timeLeft * 0.5 + increment) if movesToGo > 1 else available
+    return soft, max(soft, hard)
+
+class TimeManager:
+    def __init__(self, limits: Limits, side_to_move: chess.Color):
+        global manager
+        self.start = time.time()
+        self.soft, self.hard = allocate(limits, side_to_move)
+        self.infinite = limits.infinite
+        # `go movetime` searches exactly that long: only the hard limit ends the search
+        self.fixed_time = limits.movetime is not None
+        self.pondering = limits.ponder
+        self.ponderhit_event = threading.Event()
+        if self.hard is not None and not self.pondering:
+            stop_search.set_time_limit(self.hard)
+        manager = self
+
+    def ponderhit(self):
+        """The opponent played the predicted move: the search goes on, now on our clock.
+        The time spent pondering counts towards the soft limit, so an iteration that is
+        already deep enough is not repeated, but the hard limit starts now."""
+        if not self.pondering:
+            return
+        self.pondering = False
+        if self.hard is not None:
+            stop_search.set_time_limit(self.hard)
+        self.ponderhit_event.set()
+
+    def wait_for_bestmove(self):
+        """UCI does not allow `bestmove` while pondering or in an infinite search:
+        if the search ends early (maximum depth, mate found), wait for `ponderhit` or `stop`."""
+        while (self.pondering or self.infinite) and not stop_search.search_has_stopped():
+            if self.ponderhit_event.wait(0.01):
+                return
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def next_iteration_fits(self, iterationNodes: int, previousNodes: int, nodes: int):
+        """Decide whether to start another iteration.
+        The next iteration is predicted to take branching factor * the nodes of the last one,
+        at the speed (nps) measured so far in this search."""
+        if self.soft is None or self.pondering or self.fixed_time:
+            return True
+
+        elapsed = self.elapsed()
+        if elapsed >= self.soft:
+            return False
+
+        branchingFactor = iterationNodes / previousNodes if previousNodes else 4
+        branchingFactor = min(max(branchingFactor, 1.5), 10)
+        nps = nodes / elapsed if elapsed else 0
+        if nps == 0:
+            return True
+        predicted = iterationNodes * branchingFactor / nps
+        # don't start an iteration that can't finish before the hard limit
+        return elapsed + predicted <= self.hard
+
+# time manager of the running search, which `ponderhit` is sent to
+manager = None
+
+def ponderhit():
+    if manager is not None:
+        manager.ponderhit()
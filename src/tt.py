@@ -0,0 +1,156 @@
+# Strategos chess engine, written in Python.
+
+# tt.py contains the transposition table.
+# Positions are keyed by their Zobrist hash, and each entry stores
+# the depth, bound type, score and best move of a previous search of that position.
+
+import multiprocessing
+from engine_types import *
+
+# Bound types
+BOUND_NONE = 0; BOUND_UPPER = 1; BOUND_LOWER = 2; BOUND_EXACT = 3
+
+# Entry fields
+KEY = 0; DEPTH = 1; BOUND = 2; SCORE = 3; MOVE = 4; GENERATION = 5
+
+# Rough memory cost of one entry (the tuple, its values and the slot in the list), in bytes.
+ENTRY_SIZE = 160
+
+class TranspositionTable:
+    def __init__(self, mb: int = 16):
+        self.resize(mb)
+
+    def resize(self, mb: int):
+        """Allocate a new, empty table using about `mb` megabytes."""
+        self.size = max(1, mb * 1024 * 1024 // ENTRY_SIZE)
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """Called at the start of every search, so that old entries can be told apart."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key: int):
+        """Return the entry for the position, or None if it is not in the table."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[KEY] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score, move: chess.Move):
+        """Store a search result, following a depth-preferred replacement policy."""
+        index = key % self.size
+        entry = self.entries[index]
+
+        if entry is not None:
+            if entry[KEY] == key:
+                # same position: keep the old best move if we don't have one,
+                # and don't overwrite a much deeper result with a shallow bound.
+                if move is None:
+                    move = entry[MOVE]
+                if bound != BOUND_EXACT and depth < entry[DEPTH] - 2 and entry[GENERATION] == self.generation:
+                    return
+            elif entry[GENERATION] == self.generation and depth < entry[DEPTH]:
+                # a different position from the current search, searched deeper: keep it.
+                return
+
+        # scores are stored as integers, like in the shared table, so that both give the same results
+        self.entries[index] = (key, depth, bound, round(score), move, self.generation)
+
+    def hashfull(self):
+        """Return how full the table is in permille, sampled over the first 1000 slots."""
+        n = min(1000, self.size)
+        used = 0
+        for entry in self.entries[:n]:
+            if entry is not None and entry[GENERATION] == self.generation:
+                used += 1
+        return used * 1000 // n
+
+class SharedTranspositionTable(TranspositionTable):
+    """A transposition table in shared memory, used by all processes of a parallel search.
+    Each entry is two 64-bit words: the key XOR the data, and the data.
+    A reader only accepts an entry if the two words still match, so no locks are needed
+    even if another process overwrites the slot at the same time (lockless hashing)."""
+
+    # Bit layout of the data word
+    DEPTH_SHIFT = 32; BOUND_SHIFT = 40; GENERATION_SHIFT = 42; MOVE_SHIFT = 48
+    SCORE_LIMIT = (1 << 31) - 1
+    SHARED_ENTRY_SIZE = 16
+
+    def resize(self, mb: int):
+        self.mb = mb
+        self.size = max(1, mb * 1024 * 1024 // self.SHARED_ENTRY_SIZE)
+        self.keys = multiprocessing.RawArray("Q", self.size)
+        self.data = multiprocessing.RawArray("Q", self.size)
+        self.generation = 0
+
+    def clear(self):
+        self.resize(self.mb)
+
+    def new_search(self):
+        # generations must fit in 6 bits here
+        self.generation = (self.generation + 1) & 0x3F
+
+    @staticmethod
+    def pack_move(move: chess.Move):
+        if move is None:
+            return 0
+        return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+    @staticmethod
+    def unpack_move(m: int):
+        if m == 0:
+            return None
+        return chess.Move(m & 0x3F, (m >> 6) & 0x3F, (m >> 12) or None)
+
+    def unpack(self, key: int, data: int):
+        return (key, (data >> self.DEPTH_SHIFT) & 0xFF, (data >> self.BOUND_SHIFT) & 0x3,
+                (data & 0xFFFFFFFF) - self.SCORE_LIMIT, self.unpack_move(data >> self.MOVE_SHIFT),
+                (data >> self.GENERATION_SHIFT) & 0x3F)
+
+    def probe(self, key: int):
+        index = key % self.size
+        data = self.data[index]
+        if data and self.keys[index] ^ data == key:
+            return self.unpack(key, data)
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score, move: chess.Move):
+        index = key % self.size
+        old = self.data[index]
+
+        if old:
+            entry = self.unpack(self.keys[index] ^ old, old)
+            if entry[KEY] == key:
+                if move is None:
+                    move = entry[MOVE]
+                if bound != BOUND_EXACT and depth < entry[DEPTH] - 2 and entry[GENERATION] == self.generation:
+                    return
+            elif entry[GENERATION] == self.generation and depth < entry[DEPTH]:
+                return
+
+        score = max(-self.SCORE_LIMIT, min(self.SCORE_LIMIT, round(score)))
+        data = (score + self.SCORE_LIMIT) | min(depth, 0xFF) << self.DEPTH_SHIFT | bound << self.BOUND_SHIFT \
+            | self.generation << self.GENERATION_SHIFT | self.pack_move(move) << self.MOVE_SHIFT
+        self.keys[index] = key ^ data
+        self.data[index] = data
+
+    def hashfull(self):
+        n = min(1000, self.size)
+        used = 0
+        for i in range(n):
+            data = self.data[i]
+            if data and (data >> self.GENERATION_SHIFT) & 0x3F == self.generation:
+                used += 1
+        return used * 1000 // n
+
+def resize(mb: int, shared: bool = False):
+    """Replace the table with a new one, in shared memory if several processes will search."""
+    global table
+    table = SharedTranspositionTable(mb) if shared else TranspositionTable(mb)
+
+table = TranspositionTable(config.HASH_SIZE)
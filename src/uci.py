@@ -9,10 +9,68 @@ except ModuleNotFoundError:
     os.system("pip3 install python-chess")
     import chess
     
+import cProfile
+import sys
+import threading
+
 import position
 import search, stop_search
 from engine_types import *
 import benchmark
+import tt
+import evalcache
+import movepick
+import smp
+import timeman
+import endgame
+import analysiscache
+import book
+import perft
+import epd
+import stats
+import verify
+import evalbatch
+
+# UCI options, sent in response to the `uci` command.
+OPTIONS = [
+    f"option name Hash type spin default {config.HASH_SIZE} min 1 max 4096",
+    f"option name Threads type spin default {config.THREADS} min 1 max 256",
+    f"option name SyzygyPath type string default {config.SYZYGY_PATH or '<empty>'}",
+    "option name Ponder type check default false",
+    f"option name Move Overhead type spin default {config.MOVE_OVERHEAD} min 0 max 5000",
+    f"option name AnalysisCache type string default {config.ANALYSIS_CACHE_PATH or '<empty>'}",
+    f"option name AnalysisCacheSize type spin default {config.ANALYSIS_CACHE_SIZE} min 1000 max 100000000",
+    f"option name AnalysisCacheSeed type check default {str(config.ANALYSIS_CACHE_SEED).lower()}",
+    f"option name OwnBook type check default {str(config.OWN_BOOK).lower()}",
+    f"option name BookFile type string default {config.BOOK_FILE or '<empty>'}",
+    f"option name BestBookMove type check default {str(config.BOOK_BEST_MOVE).lower()}",
+    f"option name Stats type check default {str(config.STATS).lower()}",
+    f"option name BatchEval type check default {str(config.BATCH_EVAL).lower()}",
+]
+
+# Options of the selective search, so that the effect of each technique can be measured with bench:
+# UCI name -> (config name, min, max), with no bounds for check options.
+SEARCH_OPTIONS = {
+    "ReverseFutility": ("REVERSE_FUTILITY", None, None),
+    "ReverseFutilityMargin": ("REVERSE_FUTILITY_MARGIN", 0, 1000),
+    "ReverseFutilityDepth": ("REVERSE_FUTILITY_DEPTH", 1, 20),
+    "NullMove": ("NULL_MOVE", None, None),
+    "NullMoveReduction": ("NULL_MOVE_REDUCTION", 1, 6),
+    "Futility": ("FUTILITY", None, None),
+    "FutilityMargin": ("FUTILITY_MARGIN", 0, 1000),
+    "FutilityDepth": ("FUTILITY_DEPTH", 1, 20),
+    "LMR": ("LMR", None, None),
+    "LMRBase": ("LMR_BASE", 0, 300),
+    "LMRDivisor": ("LMR_DIVISOR", 50, 1000),
+    "CheckExtension": ("CHECK_EXTENSION", None, None),
+}
+SEARCH_OPTION_NAMES = {name.lower(): name for name in SEARCH_OPTIONS}
+for name, (configName, low, high) in SEARCH_OPTIONS.items():
+    default = getattr(config, configName)
+    if low is None:
+        OPTIONS.append(f"option name {name} type check default {str(default).lower()}")
+    else:
+        OPTIONS.append(f"option name {name} type spin default {default} min {low} max {high}")
 
 def move_to_uci(move: chess.Move):
     """Convert a chess.Move object to a UCI string."""
@@ -22,61 +80,216 @@ def uci_to_move(uci: str):
     """Convert a UCI string to a chess.Move object."""
     return chess.Move.from_uci(uci)
 
+def setoption(command: str):
+    """Handle a `setoption name <id> [value <x>]` command."""
+    tokens = command.split(" ")
+    if "value" in tokens:
+        name = " ".join(tokens[2:tokens.index("value")])
+        value = " ".join(tokens[tokens.index("value") + 1:])
+    else:
+        name = " ".join(tokens[2:])
+        value = None
+    
+    if name.lower() == "hash":
+        config.HASH_SIZE = int(value)
+        tt.table.resize(config.HASH_SIZE)
+        analysiscache.seed()
+    elif name.lower() == "threads":
+        smp.set_threads(int(value))
+        analysiscache.seed()
+    elif name.lower() == "syzygypath":
+        config.SYZYGY_PATH = value or ""
+        endgame.open_tablebase(config.SYZYGY_PATH)
+    elif name.lower() == "move overhead":
+        config.MOVE_OVERHEAD = int(value)
+    elif name.lower() == "analysiscache":
+        config.ANALYSIS_CACHE_PATH = value or ""
+        analysiscache.open_cache(config.ANALYSIS_CACHE_PATH)
+    elif name.lower() == "analysiscachesize":
+        config.ANALYSIS_CACHE_SIZE = int(value)
+        if analysiscache.cache is not None:
+            analysiscache.cache.max_entries = config.ANALYSIS_CACHE_SIZE
+    elif name.lower() == "analysiscacheseed":
+        config.ANALYSIS_CACHE_SEED = value == "true"
+    elif name.lower() == "ownbook":
+        config.OWN_BOOK = value == "true"
+    elif name.lower() == "bookfile":
+        config.BOOK_FILE = value or ""
+        book.open_book(config.BOOK_FILE)
+    elif name.lower() == "bestbookmove":
+        config.BOOK_BEST_MOVE = value == "true"
+    elif name.lower() in SEARCH_OPTION_NAMES:
+        configName, low, _ = SEARCH_OPTIONS[SEARCH_OPTION_NAMES[name.lower()]]
+        setattr(config, configName, value == "true" if low is None else int(value))
+        search.init_reductions()
+    elif name.lower() == "stats":
+        config.STATS = stats.enabled = value == "true"
+    elif name.lower() == "batcheval":
+        config.BATCH_EVAL = value == "true" and evalbatch.available()
+
+def parse_position(command: str):
+    """Return the Position given by a `position [startpos | fen <fen>] [moves <moves>]` command."""
+    tokens = command.split(" ")
+    moves = []
+    if "moves" in tokens:
+        moves = tokens[tokens.index("moves") + 1:]
+        tokens = tokens[:tokens.index("moves")]
+    
+    if tokens[1] == "fen":
+        pos = position.Position(" ".join(tokens[2:]))
+    else:
+        pos = position.Position()
+    
+    for move in moves:
+        pos.push(uci_to_move(move))
+    return pos
+
+def bench(command: str):
+    """Handle a `bench` command, see benchmark.py for the arguments."""
+    args = command.split(" ")[1:]
+    if args and args[0] in ["eval", "movegen", "batch"]:
+        iterations = [int(arg) for arg in args[1:2]]
+        if args[0] == "eval":
+            benchmark.eval_benchmark(*iterations)
+        elif args[0] == "batch":
+            benchmark.batch_benchmark(*iterations)
+        else:
+            benchmark.movegen_benchmark(*iterations)
+        return
+    
+    files = {}
+    for keyword in ["json", "baseline"]:
+        if keyword in args and args.index(keyword) + 1 < len(args):
+            files[keyword] = args[args.index(keyword) + 1]
+    numbers = [int(arg) for i, arg in enumerate(args) if arg.isdigit() and (i == 0 or args[i - 1] not in files)]
+    # bench [depth] [threads] [hash]
+    benchmark.benchmark(*numbers[:3], json_file=files.get("json"), baseline_file=files.get("baseline"))
+
+def epd_suite(command: str):
+    """Handle an `epd` command, see epd.py for the arguments."""
+    usage = "info string usage: epd <file> [nodes <n>] [movetime <ms>] [workers <n>] [json <file>]"
+    args = command.split()[1:]
+    if not args or len(args) % 2 == 0:
+        print(usage)
+        return
+    options = dict(zip(args[1::2], args[2::2]))
+    numbers = {}
+    for key, value in options.items():
+        if key == "json":
+            continue
+        if key not in ["nodes", "movetime", "workers"] or not value.isdigit():
+            print(usage)
+            return
+        numbers[key] = int(value)
+    try:
+        epd.run(args[0], numbers.get("nodes"), numbers.get("movetime"), numbers.get("workers"),
+                json_file=options.get("json"))
+    except (OSError, ValueError) as e:
+        print(f"info string cannot run {args[0]}: {e}")
+
+search_thread = None
+
+def start_search(pos: position.Position, limits: timeman.Limits):
+    """Run the search in its own thread, so that commands are still read while it runs."""
+    global search_thread
+    stop_search.reset()
+    # created here rather than in the search thread, so that `ponderhit` always finds it
+    timeManager = timeman.TimeManager(limits, pos.side_to_move)
+    target = profile_search if limits.profile else search.iterative_deepening
+    search_thread = threading.Thread(target=target, args=(pos, MAX_DEPTH, pos.side_to_move),
+                                     kwargs={"limits": limits, "time_manager": timeManager}, daemon=True)
+    search_thread.start()
+
+def profile_search(pos: position.Position, max_depth: int, side_to_move: chess.Color, limits: timeman.Limits,
+                   time_manager: timeman.TimeManager = None):
+    """Run the search under cProfile, and write the profile to config.PROFILE_FILE.
+    The file can be read with pstats, or turned into a flame graph (e.g. with flameprof or snakeviz)."""
+    profiler = cProfile.Profile()
+    profiler.runcall(search.iterative_deepening, pos, max_depth, side_to_move, limits=limits,
+                     time_manager=time_manager)
+    profiler.dump_stats(config.PROFILE_FILE)
+    print(f"info string profile written to {config.PROFILE_FILE}")
+
+def wait_for_search():
+    """Wait until the running search, if any, has printed its bestmove."""
+    if search_thread is not None:
+        search_thread.join()
+
+def stop_and_wait():
+    """Stop the running search, if any, and wait until it has printed its bestmove."""
+    if search_thread is not None and search_thread.is_alive():
+        stop_search.stop_search()
+    wait_for_search()
+
 def uci():
     """Start the UCI interface."""
+    # the GUI must see every line as soon as it is printed, also from the search thread
+    sys.stdout.reconfigure(line_buffering=True)
     print("Strategos chess engine by Muzhen J")
+    book.open_book(config.BOOK_FILE)
+    endgame.open_tablebase(config.SYZYGY_PATH)
+    # seeds the transposition table with what earlier sessions learned
+    analysiscache.open_cache(config.ANALYSIS_CACHE_PATH)
     pos = position.Position()
+    # commands are read through this reference, as smp.start_helpers() hides sys.stdin while it forks
+    stdin = sys.stdin
     while True:
-        command = input()
+        line = stdin.readline()
+        command = line.strip() if line else "quit"
+        
+        # Commands that change the engine state wait for the running search to finish.
+        # `uci`, `isready`, `stop` and `quit` are answered immediately instead.
+        if command.split(" ")[0] in ["setoption", "ucinewgame", "position", "go", "bench", "smpbench",
+                                       "perft", "divide", "perftsuite", "verify", "epd"]:
+            wait_for_search()
+        
         if command == "uci":
             print(f"id name {config.ENGINE_NAME}")
             print(f"id author {config.ENGINE_AUTHOR}")
+            for option in OPTIONS:
+                print(option)
             print("uciok")
         elif command == "isready":
             print("readyok")
+        elif command.startswith("setoption"):
+            setoption(command)
         elif command == "ucinewgame":
             pos = position.Position()
-        elif command == "position startpos":
-            pos = position.Position()
-        elif command.startswith("position startpos moves"):
-            moves = command.split("position startpos moves ")[1].split(" ")
-            for move in moves:
-                pos.board.chess_board().push(uci_to_move(move))
-        elif command.startswith("position fen") and "moves" in command:
-            fen = command.split(" ")[2]
-            moves = command.split("moves ")[1].split(" ")
-            pos = position.Position(fen)
-            for move in moves:
-                pos.board.chess_board().push(uci_to_move(move))
-        elif command.startswith("position fen"):
-            fen = command.split(" ")[2]
-            pos = position.Position(fen)
+            tt.table.clear()
+            evalcache.cache.clear()
+            movepick.clear()
+            analysiscache.seed()  # what was learned in earlier games is kept
+        elif command.startswith("position"):
+            pos = parse_position(command)
         elif command.startswith("go"):
-            if command.split(" ").__len__() > 1 and command.split(" ")[1] == "movetime":
-                movetime = int(command.split(" ")[2])
-            else:
-                movetime = None
-                
-            if command.split(" ").__len__() > 1 and command.split(" ")[1] == "depth":
-                depth = int(command.split(" ")[2])
-            else:
-                depth = MAX_DEPTH
-                
-            if command.split(" ").__len__() > 1 and command.split(" ")[1] == "infinite":
-                depth = MAX_DEPTH
-                movetime = None
-            
-            # we do not support time controls yet.
-            # we also do not support pondering.
-            # nodes and mate may be added in the future.
-            
-            search.iterative_deepening(pos, depth, pos.side_to_move, movetime)
+            # `go ponder` searches until `ponderhit` or `stop`
+            # `go ... profile` profiles the search (see profile_search)
+            start_search(pos, timeman.parse_go(command))
             
+        elif command == "ponderhit":
+            # the opponent played the move we pondered on: the search continues on our clock
+            timeman.ponderhit()
         elif command == "quit":
+            stop_and_wait()
             break
         elif command == "stop":
             # when this command is issued, we must stop searching immediately
             # and return the best move found so far ("bestmove" output).
-            stop_search.stop_search()
-        elif command == "bench":
-            benchmark.benchmark()
\ No newline at end of file
+            stop_and_wait()
+        elif command.startswith("bench"):
+            bench(command)
+        elif command.startswith("verify"):
+            # verify [max depth]
+            verify.run(*[int(arg) for arg in command.split(" ")[1:2]])
+        elif command.startswith("epd"):
+            epd_suite(command)
+        elif command.startswith("perftsuite"):
+            # perftsuite [max depth]
+            perft.suite(*[int(arg) for arg in command.split(" ")[1:2]])
+        elif command.startswith("perft") or command.startswith("divide"):
+            # perft <depth>, divide <depth>
+            perft.run(pos, int(command.split(" ")[1]), divided=command.startswith("divide"))
+        elif command.startswith("smpbench"):
+            # smpbench [depth] [max threads]
+            args = command.split(" ")[1:]
+            benchmark.smp_benchmark(*[int(arg) for arg in args])
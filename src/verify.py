@@ -0,0 +1,98 @@
+# Strategos chess engine, written in Python.
+
+# verify.py contains the verification of the search against plain minimax.
+# With the transposition table, the selective search and quiescence search switched off, alpha-beta
+# (with principal variation search) visits fewer nodes but must find exactly the minimax
+# score at a fixed depth. With a narrow window, the fail-soft score must still be correct:
+# a bound on the right side of the window, or the exact score inside it.
+# The tablebases are not probed, so that the results don't depend on SyzygyPath,
+# and the random windows are seeded by the position and depth, so that a failure can be repeated.
+#   verify [max depth]   check the search on the positions below
+
+import random
+
+import endgame
+import evalcache
+import evaluate
+import position
+import search
+from engine_types import *
+
+# Small positions: few pieces, so that plain minimax can search a few plies in reasonable time.
+POSITIONS = [
+    "8/8/8/4k3/8/8/3QK3/8 w - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/8/1p6/8/2P5/8/k7/2K5 b - - 0 1",
+    "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1",
+    "r3k3/8/8/8/8/8/8/4K2R w Kq - 0 1",
+    "8/P7/8/8/8/8/6k1/4K3 w - - 0 1",
+    "7k/6pp/8/8/8/8/1Q6/K7 w - - 0 1",
+]
+
+def minimax(pos: position.Position, depth: int, ply: int = 0):
+    """Plain negamax, without any cutoff, scoring the leaves like the search does."""
+    board = pos.board
+    if depth <= 0 or ply >= MAX_DEPTH:
+        return evaluate.evaluate(pos, board.turn)
+    if ply > 0 and search.is_draw(board):
+        return VALUE_DRAW
+    moves = board.legal_moves
+    if not moves:
+        return search.mated_in(ply) if board.is_check() else VALUE_DRAW
+
+    best = -VALUE_INF
+    for move in moves:
+        pos.push(move)
+        best = max(best, -minimax(pos, depth - 1, ply + 1))
+        pos.pop()
+    return best
+
+def check_window(score, exact, alpha, beta):
+    """Whether a fail-soft score searched with the window (alpha, beta) agrees with the exact score."""
+    if exact <= alpha:
+        return score <= alpha
+    if exact >= beta:
+        return score >= beta
+    return score == exact
+
+def run(max_depth: int = 3):
+    """Compare the search to minimax on POSITIONS, up to max_depth, and print the results."""
+    switches = (search.use_tt, search.use_qsearch)
+    selectivity = {name: getattr(config, name) for name in search.SELECTIVITY}
+    search.use_tt = search.use_qsearch = False
+    for name in search.SELECTIVITY:
+        setattr(config, name, False)
+    search.root_moves = None
+    tablebases = (endgame.tablebase, config.USE_ONLINE_TABLEBASE)
+    endgame.tablebase = None
+    config.USE_ONLINE_TABLEBASE = False
+    evalcache.cache.clear()  # evaluations may have been cached with tablebase scores
+    failed = 0
+    try:
+        for fen in POSITIONS:
+            for depth in range(1, max_depth + 1):
+                pos = position.Position(fen)
+                exact = minimax(pos, depth)
+                search.nodes = 0
+                score = search.search(pos, depth, -VALUE_INF, VALUE_INF)
+                nodes = search.nodes
+                ok = score == exact
+
+                # narrow windows below, around and above the score
+                rng = random.Random(f"{fen} {depth}")
+                for alpha, beta in [(exact - 100, exact - 50), (exact - 1, exact + 1), (exact + 50, exact + 100),
+                                    (rng.randint(-300, 0), rng.randint(1, 300))]:
+                    ok = ok and check_window(search.search(pos, depth, alpha, beta), exact, alpha, beta)
+
+                if not ok:
+                    failed += 1
+                print(f"{'ok    ' if ok else 'FAILED'} depth {depth} minimax {search.score_to_uci(exact)} "
+                      f"search {search.score_to_uci(score)} nodes {nodes} fen {fen}")
+    finally:
+        search.use_tt, search.use_qsearch = switches
+        endgame.tablebase, config.USE_ONLINE_TABLEBASE = tablebases
+        evalcache.cache.clear()
+        for name, value in selectivity.items():
+            setattr(config, name, value)
+    print(f"\n{'All passed' if not failed else f'{failed} failed'}")